@@ -0,0 +1,56 @@
+import datetime
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshWindows:
+    # Every distinct refresh time wakes the panel, so jobs that can tolerate moving snap onto a nearby
+    # refresh that is happening anyway: a daily fixed job or another already planned one-off.
+
+    def __init__(self) -> None:
+        self._daily: list[datetime.time] = []
+        self._planned: list[datetime.datetime] = []
+        # Snaps per day. Not all of them save a refresh: the window's own job may turn out to draw nothing new
+        # (Mewo already asleep at bedtime, Bert in the same season), so only the snaps themselves are counted.
+        self._snapped: Counter[datetime.date] = Counter()
+
+    def add_daily(self, at: datetime.time) -> None:
+        self._daily.append(at)
+
+    def _windows_near(self, when: datetime.datetime) -> list[datetime.datetime]:
+        days = (when.date() + datetime.timedelta(days=offset) for offset in (-1, 0, 1))
+        daily = [datetime.datetime.combine(day, at) for day in days for at in self._daily]
+        return daily + self._planned
+
+    def align(
+        self, when: datetime.datetime, tolerance: datetime.timedelta, now: datetime.datetime | None = None
+    ) -> datetime.datetime:
+        now = now or datetime.datetime.now()
+        self._planned = [planned for planned in self._planned if planned >= now]
+        candidates = [
+            window for window in self._windows_near(when) if window >= now and abs(window - when) <= tolerance
+        ]
+        if not candidates:
+            self._planned.append(when)
+            return when
+        window = min(candidates, key=lambda window: abs(window - when))
+        self._snapped[window.date()] += 1
+        logger.info(
+            "Snapped refresh at %s onto shared window %s, %d refreshes snapped on %s",
+            when,
+            window,
+            self._snapped[window.date()],
+            window.date(),
+        )
+        return window
+
+    def snapped(self, day: datetime.date) -> int:
+        return self._snapped[day]
+
+    def report(self, day: datetime.date | None = None) -> int:
+        day = day or datetime.date.today()
+        snapped = self._snapped.pop(day, 0)
+        logger.info("Refresh windows snapped %d refreshes onto shared windows on %s", snapped, day)
+        return snapped
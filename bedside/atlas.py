@@ -0,0 +1,110 @@
+import argparse
+import json
+import logging
+import mmap
+import struct
+from functools import cache
+from pathlib import Path
+
+from PIL import Image
+
+from bedside.dither import Dither, get_default, set_default
+from bedside.widget import Sprite
+
+logger = logging.getLogger(__name__)
+
+ASSETS = Path(__file__).parent / "assets"
+ATLAS_PATH = ASSETS / "atlas.bin"
+
+MAGIC = b"BDAT"
+VERSION = 2
+# magic, version, index length in bytes; the JSON index and then the plane data follow.
+_HEADER = struct.Struct("<4sII")
+
+
+def _stride(width: int) -> int:
+    return (width + 7) // 8
+
+
+def _sources(assets: Path) -> list[Path]:
+    return sorted(assets.rglob("*.bmp"))
+
+
+def build(assets: Path = ASSETS, output: Path = ATLAS_PATH, method: Dither | None = None) -> int:
+    method = method or get_default()
+    index: dict[str, dict[str, int]] = {}
+    data = bytearray()
+    for source in _sources(assets):
+        key = source.relative_to(assets).as_posix()
+        with Image.open(source) as image:
+            sprite = Sprite.from_image(image, method)
+        if sprite is None:
+            logger.info("Skipping fully transparent asset %s", key)
+            continue
+        entry = {"x": sprite.x, "y": sprite.y, "width": sprite.ink.width, "height": sprite.ink.height}
+        for plane in ("ink", "mask"):
+            entry[plane] = len(data)
+            data += getattr(sprite, plane).tobytes("raw", "1")
+        index[key] = entry
+        logger.debug("Packed %s at %s", key, entry)
+
+    encoded_index = json.dumps({"dither": method, "sprites": index}, separators=(",", ":")).encode()
+    output.write_bytes(_HEADER.pack(MAGIC, VERSION, len(encoded_index)) + encoded_index + data)
+    logger.info("Wrote %d %s-dithered sprites (%d bytes of planes) to %s", len(index), method, len(data), output)
+    return len(index)
+
+
+class Atlas:
+    # A preloaded cache of cropped, dithered sprites. The file is mapped, but PIL has no mode "1" image over a
+    # packed buffer, so every sprite is still unpacked into PIL's own byte-per-pixel storage when it is loaded.
+
+    def __init__(self, path: Path) -> None:
+        with path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} asset atlas")
+        start = _HEADER.size
+        index = json.loads(self._map[start : start + index_length])
+        self.dither = Dither(index["dither"])
+        self._index: dict[str, dict[str, int]] = index["sprites"]
+        self._data = memoryview(self._map)[start + index_length :]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def planes(self, key: str) -> tuple[memoryview, memoryview]:
+        entry = self._index[key]
+        length = _stride(entry["width"]) * entry["height"]
+        return (
+            self._data[entry["ink"] : entry["ink"] + length],
+            self._data[entry["mask"] : entry["mask"] + length],
+        )
+
+    def sprite(self, key: str) -> Sprite:
+        entry = self._index[key]
+        ink, mask = self.planes(key)
+        return Sprite.from_planes(ink, mask, (entry["width"], entry["height"]), entry["x"], entry["y"])
+
+
+@cache
+def default_atlas() -> Atlas | None:
+    if not ATLAS_PATH.exists():
+        logger.debug("No asset atlas at %s, decoding assets directly", ATLAS_PATH)
+        return None
+    built = ATLAS_PATH.stat().st_mtime
+    stale = [source for source in _sources(ASSETS) if source.stat().st_mtime > built]
+    if stale:
+        logger.warning("Asset atlas is older than %s, rebuild it with `make atlas`", [str(s) for s in stale])
+        return None
+    return Atlas(ATLAS_PATH)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(prog="bedside.atlas", description="Pack bedside assets into a sprite atlas")
+    parser.add_argument("--output", type=Path, default=ATLAS_PATH)
+    parser.add_argument("--dither", type=Dither, choices=list(Dither), default=get_default())
+    args = parser.parse_args()
+    set_default(args.dither)
+    build(output=args.output)
@@ -0,0 +1,78 @@
+import argparse
+import logging
+import timeit
+
+import numpy as np
+from PIL import Image
+
+from bedside import devspi
+from bedside.dither import Dither, dither
+from bedside.mock import MockDevConfig
+from bedside.widget import HEIGHT, WIDTH
+
+logger = logging.getLogger(__name__)
+
+
+def _gradient() -> Image.Image:
+    x = np.linspace(0, 255, WIDTH)
+    y = np.linspace(0, 255, HEIGHT)
+    return Image.fromarray(((x[None, :] + y[:, None]) / 2).astype(np.uint8), mode="L")
+
+
+def _time(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def bench_dither(args: argparse.Namespace) -> None:
+    repeat = args.repeat
+    image = _gradient()
+    print(f"Dithering a {WIDTH}x{HEIGHT} gradient, best of {repeat}")
+    for method in Dither:
+        seconds = _time(lambda method=method: dither(image, method), repeat)
+        # Re-dither a tile of the frame in place: tile-stable methods reproduce the frame's pixels exactly.
+        x, y = WIDTH // 3, HEIGHT // 3
+        whole = np.asarray(dither(image, method))[y:, x:]
+        tile = np.asarray(dither(image.crop((x, y, WIDTH, HEIGHT)), method, origin=(x, y)))
+        unstable = int(np.count_nonzero(whole != tile))
+        print(f"  {method:<16} {seconds * 1000:8.2f} ms  {unstable:6d} pixels differ when re-dithered as a tile")
+
+
+def bench_spi(args: argparse.Namespace) -> None:
+    plane = bytearray(WIDTH * HEIGHT // 8)
+    print(f"Transferring a {len(plane)} byte plane, best of {args.repeat}")
+
+    lib = MockDevConfig() if args.stub else devspi.load()
+    lib.DEV_Module_Init()
+    seconds = _time(lambda: devspi.nwrite(lib, plane), args.repeat)
+    print(f"  {'DEV_Config nwrite':<20} {seconds * 1000:8.2f} ms{' (stub)' if args.stub else ''}")
+
+    if args.stub:
+        print(f"  {'spidev writebytes2':<20} skipped, needs the panel's SPI device")
+        return
+    import spidev
+
+    spi = spidev.SpiDev()
+    spi.open(0, 0)
+    spi.max_speed_hz = 4000000
+    try:
+        seconds = _time(lambda: spi.writebytes2(plane), args.repeat)
+    finally:
+        spi.close()
+    print(f"  {'spidev writebytes2':<20} {seconds * 1000:8.2f} ms")
+
+
+BENCHMARKS = {"dither": bench_dither, "spi": bench_spi}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(prog="bedside.benchmark", description="Micro-benchmarks for bedside")
+    parser.add_argument("benchmark", nargs="*", help=f"Any of {', '.join(BENCHMARKS)}; all when omitted")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--stub", action="store_true", help="Use the DEV_Config stub instead of the native library")
+    args = parser.parse_args()
+    unknown = set(args.benchmark) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    for name in args.benchmark or BENCHMARKS:
+        BENCHMARKS[name](args)
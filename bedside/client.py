@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Mapping
+
+import aiohttp
+from yarl import URL
+
+from bedside.frame import Frame
+from bedside.server import PLANE_ENCODING
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 30.0
+
+
+def _connect(address: str) -> tuple[aiohttp.BaseConnector | None, URL]:
+    if address.startswith("unix:"):
+        return aiohttp.UnixConnector(path=address.removeprefix("unix:")), URL("http://localhost")
+    return None, URL(address)
+
+
+def _decode(body: bytes, headers: Mapping[str, str]) -> Frame:
+    if headers.get("X-Plane-Encoding") != PLANE_ENCODING:
+        raise ValueError(f"Unsupported plane encoding {headers.get('X-Plane-Encoding')!r}")
+    try:
+        width, _, height = headers["X-Frame-Size"].partition("x")
+        split = int(headers["X-Black-Length"])
+    except KeyError as missing:
+        raise ValueError(f"Frame response lacks the {missing} header") from None
+    return Frame.decode(body[:split], body[split:], width=int(width), height=int(height))
+
+
+async def poll_frames(address: str, name: str, show: Callable[[Frame], Awaitable[None]], wait: float = 300.0) -> None:
+    connector, base = _connect(address)
+    url = base / "displays" / name / "frame"
+    etag: str | None = None
+    timeout = aiohttp.ClientTimeout(total=wait + 30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        while True:
+            try:
+                headers = {"If-None-Match": f'"{etag}"'} if etag else {}
+                async with session.get(url, params={"wait": str(wait)}, headers=headers) as response:
+                    if response.status == 304:
+                        logger.debug("Frame for '%s' unchanged", name)
+                        continue
+                    response.raise_for_status()
+                    frame = _decode(await response.read(), response.headers)
+            except (aiohttp.ClientError, TimeoutError, ValueError):
+                logger.exception("Error polling %s, retrying in %ss", url, RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            logger.info("Received frame %s for '%s'", frame.etag, name)
+            try:
+                await show(frame)
+            except Exception:
+                # The panel may recover (a busy bus, a flaky connector); the etag is kept, so the same frame comes back.
+                logger.exception("Error showing frame %s, retrying in %ss", frame.etag, RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            etag = frame.etag
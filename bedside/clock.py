@@ -0,0 +1,69 @@
+import datetime
+import logging
+import string
+from functools import cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from bedside.widget import Sprite, Widget
+
+logger = logging.getLogger(__name__)
+
+# Composed on its own when it arrives with other widgets; see compose_widgets.
+CLOCK_WIDGET = "clock"
+# A fixed, byte-aligned patch of empty wall right of the cabinet, so each minute is a small partial refresh.
+# It ends above y=282, where Mewo's floor pose starts.
+CLOCK_X = 664
+CLOCK_Y = 216
+CLOCK_WIDTH = 128
+CLOCK_HEIGHT = 64
+TIME_SIZE = 32
+DATE_SIZE = 14
+_CHARSET = string.digits + string.ascii_letters + ": "
+
+
+class GlyphAtlas:
+    # Every character is rasterised once; a line of text is then a row of 1-bit pastes, no font work.
+
+    def __init__(self, size: int) -> None:
+        font = ImageFont.load_default(size)
+        ascent, descent = font.getmetrics()
+        self.height = ascent + descent
+        self.glyphs: dict[str, Image.Image] = {}
+        for char in _CHARSET:
+            glyph = Image.new("1", (round(font.getlength(char)), self.height), 255)
+            ImageDraw.Draw(glyph).text((0, 0), char, font=font, fill=0)
+            self.glyphs[char] = glyph
+
+    def width(self, text: str) -> int:
+        return sum(self.glyphs[char].width for char in text)
+
+    def blit(self, target: Image.Image, text: str, y: int) -> None:
+        # Centred horizontally in the target.
+        x = (target.width - self.width(text)) // 2
+        for char in text:
+            glyph = self.glyphs[char]
+            target.paste(glyph, (x, y))
+            x += glyph.width
+
+
+@cache
+def glyph_atlas(size: int) -> GlyphAtlas:
+    atlas = GlyphAtlas(size)
+    logger.debug("Rasterised %d glyphs at %dpx", len(atlas.glyphs), size)
+    return atlas
+
+
+def get_clock(now: datetime.datetime | None = None) -> Widget:
+    now = now or datetime.datetime.now()
+    time_glyphs, date_glyphs = glyph_atlas(TIME_SIZE), glyph_atlas(DATE_SIZE)
+    ink = Image.new("1", (CLOCK_WIDTH, CLOCK_HEIGHT), 255)
+    time_glyphs.blit(ink, now.strftime("%H:%M"), 0)
+    date_glyphs.blit(ink, f"{now:%a} {now.day} {now:%b}", time_glyphs.height)
+    # Opaque over the whole region, so the previous minute is painted out.
+    mask = Image.new("1", ink.size, 255)
+    return Widget(name=CLOCK_WIDGET, z=100, bw=Sprite(ink, mask, CLOCK_X, CLOCK_Y))
+
+
+async def tick_clock() -> Widget:
+    return get_clock()
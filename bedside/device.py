@@ -0,0 +1,221 @@
+import asyncio
+import base64
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import replace
+from enum import StrEnum
+from typing import TYPE_CHECKING
+
+from bedside.frame import Frame, changed_window, paste_window, window
+from bedside.state import load_json, save_json
+from bedside.widget import Box, union
+
+if TYPE_CHECKING:
+    from bedside.epd7in5b_V2 import EPD
+
+logger = logging.getLogger(__name__)
+
+
+class PanelState(StrEnum):
+    SLEEPING = "sleeping"
+    FULL = "full"
+    PARTIAL = "partial"
+
+
+_INIT = {PanelState.FULL: "init", PanelState.PARTIAL: "init_part"}
+
+# Black-only changes up to this share of the panel go out as a partial refresh.
+PARTIAL_AREA = 0.05
+# Partial refreshes leave ghosting behind; a full refresh clears it after this many in a row.
+PARTIAL_LIMIT = 60
+
+# The last frame sent to the panel, which an e-paper keeps showing across restarts and power cuts.
+_SHOWN = "shown.json"
+# Partial refreshes since, as the window they drew over that frame and its black rows.
+_SHOWN_WINDOW = "shown-window.json"
+
+
+def load_shown() -> Frame | None:
+    record = load_json(_SHOWN)
+    if record is None:
+        return None
+    try:
+        frame = Frame.decode(
+            base64.b64decode(record["black"]), base64.b64decode(record["red"]), record["width"], record["height"]
+        )
+        key = record.get("key")
+        drawn = load_json(_SHOWN_WINDOW)
+        if drawn is not None and drawn.get("base") == frame.etag:
+            rows = base64.b64decode(drawn["black"])
+            frame = replace(frame, black=paste_window(frame.black, rows, tuple(drawn["box"]), frame.width))
+            key = drawn.get("key")
+    except (KeyError, ValueError, TypeError):
+        logger.warning("Ignoring unusable record of the shown frame", exc_info=True)
+        return None
+    logger.info("Panel last showed frame %s (widgets %s)", frame.etag, key)
+    return replace(frame, key=key)
+
+
+def save_shown(frame: Frame) -> None:
+    black, red = frame.encode()
+    save_json(
+        _SHOWN,
+        {
+            "etag": frame.etag,
+            "key": frame.key,
+            "width": frame.width,
+            "height": frame.height,
+            "black": base64.b64encode(black).decode(),
+            "red": base64.b64encode(red).decode(),
+        },
+    )
+
+
+def save_shown_window(frame: Frame, box: Box, base: str) -> None:
+    # A clock tick writes a few hundred bytes here instead of both planes packed again.
+    save_json(
+        _SHOWN_WINDOW,
+        {
+            "base": base,
+            "key": frame.key,
+            "box": box,
+            "black": base64.b64encode(window(frame.black, box, frame.width)).decode(),
+        },
+    )
+
+
+class DeviceSession:
+    # Tracks what the panel is doing so transitions it is already through are skipped. Every init
+    # sequence starts with a hardware reset, so only staying in the same mode avoids one.
+
+    def __init__(self, epd: "EPD", shown: Frame | None = None) -> None:
+        self.epd = epd
+        self.state = PanelState.SLEEPING
+        # What the panel shows; set from a previous run, the first frame only pushes what changed.
+        self.shown = shown
+        self._resumed = shown is not None
+        self._partials = 0
+        # The frame in shown.json, the windows partial refreshes have drawn over it since, and whether the
+        # last display is yet to be saved. After a restart the first save always writes the whole frame.
+        self._saved: Frame | None = None
+        self._drawn: Box | None = None
+        self._unsaved = False
+        self.saved = 0.0
+        self._costs: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._sleeper: asyncio.TimerHandle | None = None
+        self._sleeping: asyncio.Task | None = None
+
+    def _timed(self, name: str, func: Callable[[], object]) -> None:
+        start = time.monotonic()
+        func()
+        self._costs[name] = time.monotonic() - start
+        logger.debug("EPD %s took %.2fs", name, self._costs[name])
+
+    def _skipped(self, name: str, like: str | None = None) -> None:
+        cost = self._costs.get(like or name)
+        if cost is None:
+            logger.info("Skipped EPD %s (cost not yet measured)", name)
+            return
+        self.saved += cost
+        logger.info("Skipped EPD %s, saving %.2fs (%.2fs saved this session)", name, cost, self.saved)
+
+    def _ensure(self, mode: PanelState) -> None:
+        if self.state == mode:
+            self._skipped(f"reset and init ({mode})")
+            return
+        self._timed(f"reset and init ({mode})", getattr(self.epd, _INIT[mode]))
+        logger.info("EPD initialised in %s mode", mode)
+        self.state = mode
+
+    def display(self, frame: Frame) -> None:
+        with self._lock:
+            resumed, self._resumed = self._resumed, False
+            if self.shown is not None and frame.etag == self.shown.etag:
+                logger.info("Panel already shows frame %s", frame.etag)
+                self._skipped("display")
+                return
+            box = self._partial_window(frame, resumed)
+            if box is not None:
+                self._display_partial(frame, box)
+                self._partials += 1
+                self._drawn = union(self._drawn, box)
+            else:
+                self._display_full(frame)
+                self._partials = 0
+                self._saved, self._drawn = None, None
+            self.shown = frame
+            self._unsaved = True
+
+    def save(self) -> None:
+        # Outside the windows partial refreshes drew, the panel still shows the saved frame, so only they are written.
+        with self._lock:
+            if not self._unsaved or self.shown is None:
+                return
+            self._unsaved = False
+            if self._saved is None or self._drawn is None:
+                save_shown(self.shown)
+                self._saved, self._drawn = self.shown, None
+            else:
+                save_shown_window(self.shown, self._drawn, self._saved.etag)
+
+    def _partial_window(self, frame: Frame, resumed: bool) -> Box | None:
+        # Partial mode only drives black, so red must be untouched: unchanged, and absent from the window.
+        if self.shown is None or frame.red != self.shown.red or self._partials >= PARTIAL_LIMIT:
+            return None
+        box = changed_window(self.shown, frame)
+        if box is None or any(window(frame.red, box, frame.width)):
+            return None
+        x0, y0, x1, y1 = box
+        # After a restart the panel still shows the old frame, so any black-only change is worth it.
+        if resumed or (x1 - x0) * (y1 - y0) <= PARTIAL_AREA * frame.width * frame.height:
+            return box
+        return None
+
+    def _display_full(self, frame: Frame) -> None:
+        self._ensure(PanelState.FULL)
+        # A full display rewrites both RAM planes and refreshes the whole panel, which is all Clear did.
+        self._skipped("clear", like="display")
+        logger.debug("Sending frame %s to EPD", frame.etag)
+        # EPD.display flips the black plane in place, so hand it a private copy.
+        self._timed("display", lambda: self.epd.display(bytearray(frame.black), bytearray(frame.red)))
+
+    def _display_partial(self, frame: Frame, box: Box) -> None:
+        self._ensure(PanelState.PARTIAL)
+        logger.info("Sending window %s of frame %s to EPD", box, frame.etag)
+        # The driver takes the whole plane and the box: a full-width window is sent as a slice of it, a narrower
+        # one has its rows gathered straight into the single SPI transfer.
+        self._timed("partial display", lambda: self.epd.display_Partial_frame(memoryview(frame.black), *box))
+
+    def sleep(self) -> None:
+        with self._lock:
+            if self.state == PanelState.SLEEPING:
+                return
+            self._timed("sleep", self.epd.sleep)
+            self.state = PanelState.SLEEPING
+            logger.debug("EPD put to sleep")
+
+    def sleep_after(self, delay: float) -> None:
+        # Stay awake briefly: a frame arriving in the meantime skips both the sleep and the re-init.
+        # Called from the event loop, whose clock (real or the soak's virtual one) times the wait.
+        self.cancel_sleep()
+        self._sleeper = asyncio.get_running_loop().call_later(delay, self._start_sleep)
+
+    def cancel_sleep(self) -> None:
+        # Only a sleep that has not started is saved; one already under way finishes and the next frame re-inits.
+        if self._sleeper is not None:
+            self._sleeper.cancel()
+            self._sleeper = None
+            self._skipped("sleep")
+
+    def _start_sleep(self) -> None:
+        self._sleeper = None
+        self._sleeping = asyncio.create_task(self._sleep())
+
+    async def _sleep(self) -> None:
+        try:
+            await asyncio.to_thread(self.sleep)
+        except Exception:
+            logger.exception("Error putting EPD to sleep")
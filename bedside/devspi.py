@@ -0,0 +1,53 @@
+import ctypes
+import logging
+import os
+import struct
+from functools import cache
+
+logger = logging.getLogger(__name__)
+
+# Selects how epdconfig.RaspberryPi moves frame planes: "spidev" (default) or "devconfig".
+BACKEND_ENV = "EPD_SPI_BACKEND"
+SPIDEV = "spidev"
+DEVCONFIG = "devconfig"
+
+_SEARCH_DIRS = [os.path.dirname(os.path.realpath(__file__)), "/usr/local/lib", "/usr/lib"]
+
+
+def backend() -> str:
+    return os.environ.get(BACKEND_ENV, SPIDEV)
+
+
+@cache
+def find_library() -> str | None:
+    # The library has to match this interpreter, not the kernel, so ask for our own pointer size.
+    bits = struct.calcsize("P") * 8
+    logger.debug("Python is %d bit", bits)
+    name = "DEV_Config_64.so" if bits == 64 else "DEV_Config_32.so"
+    for directory in _SEARCH_DIRS:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@cache
+def load() -> ctypes.CDLL:
+    path = find_library()
+    if path is None:
+        raise RuntimeError(f"Cannot find DEV_Config.so in {_SEARCH_DIRS}")
+    lib = ctypes.CDLL(path)
+    lib.DEV_SPI_SendData.argtypes = [ctypes.c_ubyte]
+    lib.DEV_SPI_SendnData.argtypes = [ctypes.POINTER(ctypes.c_ubyte), ctypes.c_uint32]
+    lib.DEV_SPI_ReadData.restype = ctypes.c_ubyte
+    logger.info("Loaded native SPI library %s", path)
+    return lib
+
+
+def nwrite(lib: ctypes.CDLL, data: bytes | bytearray | list[int]) -> None:
+    # One call for the whole plane; a bytearray is passed without copying.
+    if isinstance(data, bytearray):
+        buffer = (ctypes.c_ubyte * len(data)).from_buffer(data)
+    else:
+        buffer = (ctypes.c_ubyte * len(data)).from_buffer_copy(bytes(data))
+    lib.DEV_SPI_SendnData(buffer, len(data))
@@ -0,0 +1,66 @@
+import logging
+from enum import StrEnum
+from functools import cache
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class Dither(StrEnum):
+    THRESHOLD = "threshold"
+    BAYER = "bayer"
+    FLOYD_STEINBERG = "floyd-steinberg"
+
+
+def _bayer(order: int) -> np.ndarray:
+    matrix = np.zeros((1, 1), dtype=np.int32)
+    for _ in range(order):
+        matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return matrix
+
+
+_BAYER = _bayer(3)
+_BAYER_SIZE = _BAYER.shape[0]
+# Scaled so pure black and pure white are never dithered.
+_BAYER_THRESHOLDS = ((_BAYER + 0.5) * 255 / _BAYER.size).astype(np.uint8)
+
+
+@cache
+def _bayer_table(rows: int, columns: int) -> np.ndarray:
+    return np.tile(_BAYER_THRESHOLDS, (rows, columns))
+
+
+_method = Dither.FLOYD_STEINBERG
+
+
+def set_default(method: Dither) -> None:
+    global _method
+    logger.info("Using %s dithering", method)
+    _method = method
+
+
+def get_default() -> Dither:
+    return _method
+
+
+def _ordered(image: Image.Image, origin: tuple[int, int]) -> Image.Image:
+    pixels = np.asarray(image.convert("L"))
+    height, width = pixels.shape
+    x, y = origin[0] % _BAYER_SIZE, origin[1] % _BAYER_SIZE
+    table = _bayer_table(-(-(y + height) // _BAYER_SIZE), -(-(x + width) // _BAYER_SIZE))
+    thresholds = table[y : y + height, x : x + width]
+    return Image.fromarray(pixels > thresholds)
+
+
+def dither(image: Image.Image, method: Dither | None = None, origin: tuple[int, int] = (0, 0)) -> Image.Image:
+    # origin is where the image sits on the panel, keeping ordered patterns aligned between sprites and frames.
+    method = method or _method
+    match method:
+        case Dither.THRESHOLD:
+            return image.convert("1", dither=Image.Dither.NONE)
+        case Dither.BAYER:
+            return _ordered(image, origin)
+        case Dither.FLOYD_STEINBERG:
+            return image.convert("1", dither=Image.Dither.FLOYDSTEINBERG)
@@ -29,6 +29,7 @@
 
 
 import logging
+from functools import cache
 
 from bedside import epdconfig
 
@@ -39,6 +40,12 @@ EPD_HEIGHT = 480
 logger = logging.getLogger(__name__)
 
 
+@cache
+def fill(value, length):
+    # Uniform planes are sent in one bulk transfer; the buffers are immutable, so one of each is shared.
+    return bytes([value & 0xFF]) * length
+
+
 class EPD:
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
@@ -229,20 +236,38 @@ class EPD:
             Width = self.width // 8 + 1
         Height = self.height
         self.send_command(0x10)  # Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(color)
+        self.send_data2(fill(color, Width * Height))
 
         self.send_command(0x13)  # Write Black and White image to RAM
-        for j in range(Height):
-            for i in range(Width):
-                self.send_data(~color)
+        self.send_data2(fill(~color, Width * Height))
 
         self.send_command(0x12)
         epdconfig.delay_ms(100)
         self.ReadBusy()
 
     def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
+        self._partial_window(Xstart, Ystart, Xend, Yend)
+        self.send_command(0x13)  # Write Black and White image to RAM
+        self.send_data2(Image)
+        self._partial_refresh()
+
+    def display_Partial_frame(self, imageblack, Xstart, Ystart, Xend, Yend):
+        # Like display_Partial, but imageblack is the whole black plane (getbuffer layout), typically a
+        # memoryview. A full-width window is sent as a slice of it, without a copy. A narrower one has its
+        # rows gathered into one buffer, so it still goes out in a single transfer rather than one per row.
+        Xstart, Xend = self._partial_window(Xstart, Ystart, Xend, Yend)
+        frame = memoryview(imageblack)
+        columns = self.width // 8
+        self.send_command(0x13)  # Write Black and White image to RAM
+        if Xstart == 0 and Xend == self.width:
+            self.send_data2(frame[Ystart * columns : Yend * columns])
+        else:
+            self.send_data2(
+                b"".join(frame[y * columns + Xstart // 8 : y * columns + Xend // 8] for y in range(Ystart, Yend))
+            )
+        self._partial_refresh()
+
+    def _partial_window(self, Xstart, Ystart, Xend, Yend):
         if (Xstart % 8 + Xend % 8 == 8 & Xstart % 8 > Xend % 8) | Xstart % 8 + Xend % 8 == 0 | (Xend - Xstart) % 8 == 0:
             Xstart = Xstart // 8 * 8
             Xend = Xend // 8 * 8
@@ -278,25 +303,20 @@ class EPD:
         if self.partFlag == 1:
             self.partFlag = 0
             self.send_command(0x10)
-            for j in range(Height):
-                for i in range(Width):
-                    self.send_data(0xFF)
-
-        self.send_command(0x13)  # Write Black and White image to RAM
-        self.send_data2(Image)
+            self.send_data2(fill(0xFF, Width * Height))
+        return Xstart, Xend
 
+    def _partial_refresh(self):
         self.send_command(0x12)
         epdconfig.delay_ms(100)
         self.ReadBusy()
 
     def Clear(self):
-        buf = [0x00] * (int(self.width / 8) * self.height)
-        buf2 = [0xFF] * (int(self.width / 8) * self.height)
         self.send_command(0x10)
-        self.send_data2(buf2)
+        self.send_data2(fill(0xFF, int(self.width / 8) * self.height))
 
         self.send_command(0x13)
-        self.send_data2(buf)
+        self.send_data2(fill(0x00, int(self.width / 8) * self.height))
 
         self.send_command(0x12)
         epdconfig.delay_ms(100)
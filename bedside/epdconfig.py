@@ -34,6 +34,8 @@ import sys
 import time
 from ctypes import *
 
+from bedside import devspi
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,6 +59,9 @@ class RaspberryPi:
         # self.GPIO_CS_PIN     = gpiozero.LED(self.CS_PIN)
         self.GPIO_PWR_PIN = gpiozero.LED(self.PWR_PIN)
         self.GPIO_BUSY_PIN = gpiozero.Button(self.BUSY_PIN, pull_up=False)
+        self.DEV_SPI = None
+        self.backend = devspi.backend()
+        logger.debug("SPI backend is %s", self.backend)
 
     def digital_write(self, pin, value):
         if pin == self.RST_PIN:
@@ -96,16 +101,23 @@ class RaspberryPi:
         time.sleep(delaytime / 1000.0)
 
     def spi_writebyte(self, data):
-        self.SPI.writebytes(data)
+        if self.backend == devspi.DEVCONFIG:
+            for byte in data:
+                self.DEV_SPI_write(byte)
+        else:
+            self.SPI.writebytes(data)
 
     def spi_writebyte2(self, data):
-        self.SPI.writebytes2(data)
+        if self.backend == devspi.DEVCONFIG:
+            self.DEV_SPI_nwrite(data)
+        else:
+            self.SPI.writebytes2(data)
 
     def DEV_SPI_write(self, data):
         self.DEV_SPI.DEV_SPI_SendData(data)
 
     def DEV_SPI_nwrite(self, data):
-        self.DEV_SPI.DEV_SPI_SendnData(data)
+        devspi.nwrite(self.DEV_SPI, data)
 
     def DEV_SPI_read(self):
         return self.DEV_SPI.DEV_SPI_ReadData()
@@ -113,27 +125,11 @@ class RaspberryPi:
     def module_init(self, cleanup=False):
         self.GPIO_PWR_PIN.on()
 
-        if cleanup:
-            find_dirs = [
-                os.path.dirname(os.path.realpath(__file__)),
-                "/usr/local/lib",
-                "/usr/lib",
-            ]
-            self.DEV_SPI = None
-            for find_dir in find_dirs:
-                val = int(os.popen("getconf LONG_BIT").read())
-                logging.debug("System is %d bit" % val)
-                if val == 64:
-                    so_filename = os.path.join(find_dir, "DEV_Config_64.so")
-                else:
-                    so_filename = os.path.join(find_dir, "DEV_Config_32.so")
-                if os.path.exists(so_filename):
-                    self.DEV_SPI = CDLL(so_filename)
-                    break
+        if cleanup or self.backend == devspi.DEVCONFIG:
+            # Located and initialised once; module_init runs again on every wake from sleep.
             if self.DEV_SPI is None:
-                RuntimeError("Cannot find DEV_Config.so")
-
-            self.DEV_SPI.DEV_Module_Init()
+                self.DEV_SPI = devspi.load()
+                self.DEV_SPI.DEV_Module_Init()
 
         else:
             # SPI device, bus = 0, device = 0
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import StrEnum
+from functools import partial
+from typing import Any, TypeVar
+
+from bedside.dither import get_default, set_default
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExecutorKind(StrEnum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+_executor: Executor | None = None
+
+
+def configure(kind: ExecutorKind = ExecutorKind.THREAD, workers: int | None = None) -> Executor:
+    global _executor
+    shutdown()
+    if kind == ExecutorKind.PROCESS:
+        # Workers start with fresh module state, so carry over settings the loaders read.
+        _executor = ProcessPoolExecutor(workers, initializer=set_default, initargs=(get_default(),))
+    else:
+        _executor = ThreadPoolExecutor(workers, thread_name_prefix="bedside-render")
+    logger.info("Rendering in a %s pool with %s workers", kind, workers or "default")
+    return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def offload(func: Callable[..., T], *args: Any) -> T:
+    executor = _executor or configure()
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(func, *args))
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+from PIL import Image
+
+from bedside import packbits
+from bedside.executor import offload
+from bedside.widget import HEIGHT, WIDTH, Box, Sprite, Widget
+
+logger = logging.getLogger(__name__)
+
+# The panel treats a set bit as ink, PIL treats a set bit as white.
+_INVERT = bytes(0xFF - i for i in range(256))
+
+
+@dataclass(frozen=True)
+class Frame:
+    black: bytes
+    red: bytes
+    width: int = WIDTH
+    height: int = HEIGHT
+    # Which widgets, where, the frame was composed from; see widget_key.
+    key: str | None = field(default=None, compare=False)
+    # Widget names bottom to top, and seconds spent in each stage that produced the frame.
+    widgets: tuple[str, ...] = field(default=(), compare=False)
+    timings: dict[str, float] = field(default_factory=dict, compare=False)
+
+    @cached_property
+    def etag(self) -> str:
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{self.width}x{self.height}".encode())
+        digest.update(self.black)
+        digest.update(self.red)
+        return digest.hexdigest()
+
+    @cached_property
+    def _encoded(self) -> tuple[bytes, bytes]:
+        return packbits.encode(self.black), packbits.encode(self.red)
+
+    def encode(self) -> tuple[bytes, bytes]:
+        # Packed once however many places (state, history, server) keep the frame.
+        return self._encoded
+
+    @classmethod
+    def decode(cls, black: bytes, red: bytes, width: int = WIDTH, height: int = HEIGHT) -> "Frame":
+        frame = cls(black=packbits.decode(black), red=packbits.decode(red), width=width, height=height)
+        expected = width * height // 8
+        if len(frame.black) != expected or len(frame.red) != expected:
+            raise ValueError(f"Frame planes must be {expected} bytes")
+        return frame
+
+
+def widget_key(widgets: Iterable[Widget]) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for widget in sorted(widgets, key=lambda w: (w.z, w.name)):
+        digest.update(f"{widget.name}:{widget.z}:{widget.bbox}".encode())
+    return digest.hexdigest()
+
+
+def _rows(plane: bytes, width: int) -> np.ndarray:
+    return np.frombuffer(plane, np.uint8).reshape(-1, width // 8)
+
+
+def changed_window(old: Frame, new: Frame) -> Box | None:
+    # Smallest byte-aligned box holding every black-plane difference, None when the planes are equal.
+    diff = _rows(old.black, old.width) != _rows(new.black, new.width)
+    rows, cols = np.flatnonzero(diff.any(axis=1)), np.flatnonzero(diff.any(axis=0))
+    if not len(rows):
+        return None
+    return int(cols[0]) * 8, int(rows[0]), (int(cols[-1]) + 1) * 8, int(rows[-1]) + 1
+
+
+def window(plane: bytes, box: Box, width: int = WIDTH) -> bytes:
+    # The rows of a byte-aligned box cut out of a packed plane, as display_Partial takes them.
+    x0, y0, x1, y1 = box
+    return _rows(plane, width)[y0:y1, x0 // 8 : x1 // 8].tobytes()
+
+
+def paste_window(plane: bytes, rows: bytes, box: Box, width: int = WIDTH) -> bytes:
+    # The inverse of window: the plane with the box's rows replaced.
+    x0, y0, x1, y1 = box
+    pasted = _rows(plane, width).copy()
+    pasted[y0:y1, x0 // 8 : x1 // 8] = np.frombuffer(rows, np.uint8).reshape(y1 - y0, -1)
+    return pasted.tobytes()
+
+
+def compose_plane(sprites: Iterable[Sprite | None], width: int = WIDTH, height: int = HEIGHT) -> Image.Image:
+    plane = Image.new("1", (width, height), 255)
+    for sprite in sprites:
+        if sprite is not None:
+            plane.paste(sprite.ink, (sprite.x, sprite.y), sprite.mask)
+    return plane
+
+
+def compose(widgets: Iterable[Widget], width: int = WIDTH, height: int = HEIGHT) -> tuple[Image.Image, Image.Image]:
+    ordered = sorted(widgets, key=lambda w: w.z)
+    logger.debug("Compositing widgets %s", [(widget.name, widget.z) for widget in ordered])
+    return (
+        compose_plane((widget.bw for widget in ordered), width, height),
+        compose_plane((widget.red for widget in ordered), width, height),
+    )
+
+
+def pack_plane(image: Image.Image) -> bytes:
+    # Same layout as EPD.getbuffer: packed rows, one bit per pixel, set bits are ink.
+    return image.tobytes("raw").translate(_INVERT)
+
+
+def render_plane(sprites: Iterable[Sprite | None], width: int = WIDTH, height: int = HEIGHT) -> bytes:
+    return pack_plane(compose_plane(sprites, width, height))
+
+
+def render_frame(widgets: Iterable[Widget], width: int = WIDTH, height: int = HEIGHT) -> Frame:
+    bw, red = compose(widgets, width, height)
+    return Frame(black=pack_plane(bw), red=pack_plane(red), width=width, height=height)
+
+
+async def render_frame_offloaded(widgets: Iterable[Widget], width: int = WIDTH, height: int = HEIGHT) -> Frame:
+    # The two planes are independent, so they render side by side in the executor pool.
+    start = time.perf_counter()
+    ordered = sorted(widgets, key=lambda w: w.z)
+    logger.debug("Compositing widgets %s", [(widget.name, widget.z) for widget in ordered])
+    black, red = await asyncio.gather(
+        offload(render_plane, [widget.bw for widget in ordered], width, height),
+        offload(render_plane, [widget.red for widget in ordered], width, height),
+    )
+    return Frame(
+        black=black,
+        red=red,
+        width=width,
+        height=height,
+        key=widget_key(ordered),
+        widgets=tuple(widget.name for widget in ordered),
+        timings={"compose": time.perf_counter() - start},
+    )
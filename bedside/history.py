@@ -0,0 +1,169 @@
+import argparse
+import datetime
+import json
+import logging
+import struct
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from PIL import Image
+
+from bedside.frame import Frame
+from bedside.state import state_dir, write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Entries kept per display, both in memory and on disk.
+HISTORY_SIZE = 64
+MAGIC = b"BDHI"
+VERSION = 1
+# magic, version, metadata length; then JSON metadata, then the packbits black and red planes.
+_HEADER = struct.Struct("<4sII")
+
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    sequence: int
+    shown_at: str
+    etag: str
+    width: int
+    height: int
+    black: bytes
+    red: bytes
+    key: str | None = None
+    widgets: tuple[str, ...] = ()
+    timings: dict[str, float] = field(default_factory=dict)
+
+    def frame(self) -> Frame:
+        return Frame.decode(self.black, self.red, self.width, self.height)
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps({
+            "sequence": self.sequence,
+            "shown_at": self.shown_at,
+            "etag": self.etag,
+            "width": self.width,
+            "height": self.height,
+            "key": self.key,
+            "widgets": self.widgets,
+            "timings": self.timings,
+            "black": len(self.black),
+        }).encode()
+        return _HEADER.pack(MAGIC, VERSION, len(meta)) + meta + self.black + self.red
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HistoryEntry":
+        magic, version, length = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} history entry")
+        meta = json.loads(data[_HEADER.size : _HEADER.size + length])
+        planes = data[_HEADER.size + length :]
+        black = meta.pop("black")
+        meta["widgets"] = tuple(meta["widgets"])
+        return cls(black=planes[:black], red=planes[black:], **meta)
+
+
+class FrameHistory:
+    # The last frames pushed to a display, packbits-compressed. The disk copy is a fixed set of slot
+    # files overwritten in turn, so it survives restarts without ever growing.
+
+    def __init__(self, name: str, capacity: int = HISTORY_SIZE, directory: Path | None = None) -> None:
+        self.name = name
+        self.capacity = capacity
+        self._directory = directory or state_dir() / "history" / name
+        self._entries: deque[HistoryEntry] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _slot(self, sequence: int) -> Path:
+        return self._directory / f"{sequence % self.capacity:04d}.bin"
+
+    def _load(self) -> None:
+        entries = []
+        for path in self._directory.glob("*.bin"):
+            try:
+                entries.append(HistoryEntry.from_bytes(path.read_bytes()))
+            except (OSError, ValueError, KeyError, TypeError, struct.error):
+                logger.warning("Ignoring unreadable history entry %s", path, exc_info=True)
+        entries.sort(key=lambda entry: entry.sequence)
+        self._entries.extend(entries)
+        logger.debug("Loaded %d history entries for '%s'", len(self._entries), self.name)
+
+    def wants(self, frame: Frame) -> bool:
+        # Every frame pushed is recorded, except the one the latest entry already holds (pushed again after a restart).
+        with self._lock:
+            return not self._entries or self._entries[-1].etag != frame.etag
+
+    def append(self, frame: Frame, timings: dict[str, float]) -> HistoryEntry:
+        black, red = frame.encode()
+        with self._lock:
+            entry = HistoryEntry(
+                sequence=self._entries[-1].sequence + 1 if self._entries else 0,
+                shown_at=datetime.datetime.now().isoformat(timespec="seconds"),
+                etag=frame.etag,
+                width=frame.width,
+                height=frame.height,
+                black=black,
+                red=red,
+                key=frame.key,
+                widgets=frame.widgets,
+                timings={**frame.timings, **timings},
+            )
+            self._entries.append(entry)
+        try:
+            write_atomic(self._slot(entry.sequence), entry.to_bytes())
+        except OSError:
+            logger.warning("Could not save history entry %d", entry.sequence, exc_info=True)
+        return entry
+
+    def entries(self) -> list[HistoryEntry]:
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, sequence: int) -> HistoryEntry:
+        # Negative numbers count back from the latest entry, like list indices.
+        entries = self.entries()
+        if sequence < 0:
+            return entries[sequence]
+        for entry in entries:
+            if entry.sequence == sequence:
+                return entry
+        raise KeyError(sequence)
+
+
+def to_image(frame: Frame) -> Image.Image:
+    # As the panel shows it: white paper, black ink, red ink on top.
+    size = (frame.width, frame.height)
+    image = Image.new("RGB", size, "white")
+    image.paste((0, 0, 0), mask=Image.frombytes("1", size, frame.black))
+    image.paste((255, 0, 0), mask=Image.frombytes("1", size, frame.red))
+    return image
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(prog="bedside.history", description="Inspect frames recently sent to a display")
+    parser.add_argument("--name", default="bedside", help="Display name")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the recorded frames")
+    export_parser = commands.add_parser("export", help="Save a recorded frame as a PNG")
+    export_parser.add_argument("sequence", type=int, help="Entry number, or negative to count back from the latest")
+    export_parser.add_argument("output", type=Path)
+    args = parser.parse_args()
+
+    history = FrameHistory(args.name)
+    match args.command:
+        case "list":
+            for entry in history.entries():
+                timings = " ".join(f"{stage} {seconds:.2f}s" for stage, seconds in entry.timings.items())
+                widgets = ",".join(entry.widgets)
+                print(f"{entry.sequence:6d} {entry.shown_at} {entry.etag} {widgets} {timings}")
+        case "export":
+            try:
+                entry = history.get(args.sequence)
+            except (KeyError, IndexError):
+                parser.error(f"no frame {args.sequence} in history")
+            to_image(entry.frame()).save(args.output)
+            print(f"Frame {entry.sequence} ({entry.etag}, shown {entry.shown_at}) saved to {args.output}")
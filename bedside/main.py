@@ -4,70 +4,144 @@ import datetime
 import inspect
 import logging
 import random
+import time
 from asyncio.queues import Queue
-from importlib import resources
+from contextlib import nullcontext
+from pathlib import Path
 from random import randint
-from typing import Any, Coroutine
+from typing import Any
 
-from PIL import Image
 from scheduler.asyncio import Scheduler
 
-import bedside
-from bedside import epd7in5b_V2
+from bedside.alignment import RefreshWindows
+from bedside.client import poll_frames
+from bedside.clock import CLOCK_WIDGET, get_clock, tick_clock
+from bedside.device import DeviceSession, load_shown
+from bedside.dither import Dither, get_default, set_default
+from bedside.executor import ExecutorKind, configure, offload, shutdown
+from bedside.frame import Frame, render_frame_offloaded
+from bedside.history import FrameHistory
 from bedside.mewo import Mewo
+from bedside.pipeline import FramePipeline, FrameSink
 from bedside.seasons import get_bert
-from bedside.weather import get_next_sunrise, get_next_sunset, get_night, get_weather
-from bedside.widget import Widget
+from bedside.server import FrameStore, serve
+from bedside.trace import record
+from bedside.weather import get_cached_weather, get_next_sunrise, get_next_sunset, get_night, get_weather
+from bedside.widget import Widget, load_sprite
 
 logger = logging.getLogger(__name__)
 
+# Seconds the panel stays awake after a refresh in case another frame follows.
+IDLE = 2.0
+# Seconds to keep collecting widgets after the first arrives before composing a frame.
+SETTLE = 5.0
 
-def display_widgets(epd: epd7in5b_V2.EPD, widgets: dict[str, Widget]) -> None:
-    logger.debug("Entering display_widgets with %d widgets", len(widgets))
-    epd.init()
-    logger.info("EPD initialized")
-    epd.Clear()
-    logger.info("EPD cleared")
 
-    bw = Image.new("RGBA", (epd.width, epd.height), (255, 255, 255, 0))
-    red = Image.new("RGBA", (epd.width, epd.height), (255, 255, 255, 0))
+def epd_sink() -> FrameSink:
+    # Imported lazily: epdconfig probes the board on import, which a frame server host cannot satisfy.
+    from bedside import epd7in5b_V2
 
-    logger.debug("Starting widget composition")
-    for widget in sorted(widgets.values(), key=lambda w: w.z):
-        logger.debug("Compositing widget '%s' at z=%d", widget.name, widget.z)
-        bw.alpha_composite(widget.bw)
-        red.alpha_composite(widget.red)
+    session = DeviceSession(epd7in5b_V2.EPD(), shown=load_shown())
 
-    bw_final = bw.convert("1")
-    red_final = red.convert("1")
+    # The panel calls block for seconds, so they run on a worker thread to keep composing in parallel.
+    def display(frame: Frame) -> None:
+        session.display(frame)
+        # Saving is disk work too, so it stays off the loop.
+        session.save()
 
-    logger.debug("Sending composed image to EPD")
-    epd.display(epd.getbuffer(bw_final), epd.getbuffer(red_final))
-    logger.info("Display updated with %d widgets", len(widgets))
+    async def show(frame: Frame) -> None:
+        session.cancel_sleep()
+        await asyncio.to_thread(display, frame)
+        session.sleep_after(IDLE)
 
+    return show
 
-async def process_event_loop(queue: Queue[Widget], initial_widgets: list[Widget]) -> None:
-    logger.debug("Starting process_event_loop")
-    epd = epd7in5b_V2.EPD()
+
+def timed_first_frame(sink: FrameSink, started: float) -> FrameSink:
+    shown = False
+
+    async def show(frame: Frame) -> None:
+        nonlocal shown
+        await sink(frame)
+        if not shown:
+            shown = True
+            logger.info("Time to first frame: %.2fs", time.monotonic() - started)
+
+    return show
+
+
+def saving_mewo(sink: FrameSink, mewo: Mewo, name: str) -> FrameSink:
+    # Saved alongside every shown frame so a restart recomposes the same picture.
+    async def show(frame: Frame) -> None:
+        await sink(frame)
+        mewo.save(name)
+
+    return show
+
+
+def store_sink(store: FrameStore, name: str) -> FrameSink:
+    async def publish(frame: Frame) -> None:
+        await store.publish(name, frame)
+
+    return publish
+
+
+async def receive_widgets(queue: Queue[Widget], settle: float) -> list[Widget]:
+    # Jobs sharing a refresh window finish a few seconds apart (network fetches, decoding), so collect
+    # everything that lands within the settle period into a single frame.
+    received = [await queue.get()]
+    deadline = asyncio.get_running_loop().time() + settle
+    while (remaining := deadline - asyncio.get_running_loop().time()) > 0:
+        try:
+            received.append(await asyncio.wait_for(queue.get(), remaining))
+        except TimeoutError:
+            break
+    return received
+
+
+async def compose_widgets(
+    queue: Queue[Widget], initial_widgets: list[Widget], pipeline: FramePipeline, settle: float = SETTLE
+) -> None:
     widgets: dict[str, Widget] = {widget.name: widget for widget in initial_widgets}
     logger.info("Initialised event loop with %d widgets", len(widgets))
 
     while True:
         try:
             logger.debug("Refreshing display with current widgets")
-            display_widgets(epd, widgets)
-            await asyncio.sleep(2)
-            epd.sleep()
-            logger.debug("EPD put to sleep")
+            frame = await render_frame_offloaded(widgets.values())
+            pipeline.submit(frame)
+            logger.info("Frame %s ready with %d widgets", frame.etag, len(widgets))
 
             logger.debug("Waiting for widget from queue...")
-            new_widget = await queue.get()
-            logger.info("Received widget '%s' from queue", new_widget.name)
-            widgets[new_widget.name] = new_widget
+            received = await receive_widgets(queue, settle)
+            clock = next((widget for widget in received if widget.name == CLOCK_WIDGET), None)
+            if clock is not None and len(received) > 1:
+                # The clock alone is a small partial refresh. Merged with another layer's change (Mewo's ticks fall
+                # on the minute too) the changed window grows past what a partial refresh takes.
+                widgets[clock.name] = clock
+                frame = await render_frame_offloaded(widgets.values())
+                pipeline.submit(frame)
+                logger.info("Frame %s ready with the clock alone", frame.etag)
+            for new_widget in received:
+                logger.info("Received widget '%s' from queue", new_widget.name)
+                widgets[new_widget.name] = new_widget
         except Exception:
             logger.exception("Error in process_event_loop")
 
 
+async def process_event_loop(
+    queue: Queue[Widget],
+    initial_widgets: list[Widget],
+    sink: FrameSink,
+    settle: float = SETTLE,
+    history: FrameHistory | None = None,
+) -> None:
+    logger.debug("Starting process_event_loop")
+    # Frames are composed as widgets arrive while the sink takes the latest one whenever it is free.
+    pipeline = FramePipeline(sink, history)
+    await asyncio.gather(compose_widgets(queue, initial_widgets, pipeline, settle), pipeline.run())
+
+
 async def draw_widget_maybe(queue: Queue[Widget], widget: Any) -> None:
     logger.debug("Entering draw_widget_maybe with widget type=%s", type(widget).__name__)
     try:
@@ -85,28 +159,61 @@ async def draw_widget_maybe(queue: Queue[Widget], widget: Any) -> None:
         logger.exception("Error in draw_widget_maybe")
 
 
-def schedule_mewo(scheduler: Scheduler, queue: Queue[Widget]) -> None:
+MEWO_TOLERANCE = datetime.timedelta(minutes=30)
+SUN_TOLERANCE = datetime.timedelta(minutes=10)
+MEWO_SLEEP = datetime.time(hour=21, minute=0)
+MEWO_AWAKE = datetime.time(hour=7, minute=0)
+MIDNIGHT = datetime.time(hour=0, minute=0, second=0)
+CLOCK_TICK = datetime.time(second=0)
+WEATHER_RETRY = datetime.timedelta(seconds=30)
+WEATHER_RETRY_MAX = datetime.timedelta(hours=1)
+
+
+async def mewo_tick(
+    scheduler: Scheduler, windows: RefreshWindows, queue: Queue[Widget], mewo: Mewo, tick: datetime.datetime
+) -> None:
+    # The next tick follows the nominal time rather than the window this one snapped to.
+    schedule_mewo_tick(scheduler, windows, queue, mewo, tick + datetime.timedelta(hours=1))
+    await draw_widget_maybe(queue, mewo.random())
+
+
+def schedule_mewo_tick(
+    scheduler: Scheduler, windows: RefreshWindows, queue: Queue[Widget], mewo: Mewo, tick: datetime.datetime
+) -> None:
+    at = windows.align(tick, MEWO_TOLERANCE)
+    scheduler.once(at, mewo_tick, args=(scheduler, windows, queue, mewo, tick))
+    logger.debug(f"Scheduled Mewo tick at {at=} for {tick=}")
+
+
+async def wake_mewo(mewo: Mewo) -> None:
+    mewo.awake()
+
+
+def schedule_mewo(scheduler: Scheduler, windows: RefreshWindows, queue: Queue[Widget], mewo: Mewo) -> None:
     logger.debug("Scheduling Mewo events")
-    mewo = Mewo()
-    scheduler.hourly(
-        datetime.time(minute=randint(0, 59), second=0),
-        lambda: draw_widget_maybe(queue, mewo.random()),
-    )
+    now = datetime.datetime.now()
+    tick = now.replace(minute=randint(0, 59), second=0, microsecond=0)
+    if tick <= now:
+        tick += datetime.timedelta(hours=1)
     scheduler.daily(
-        datetime.time(hour=21, minute=0),
+        MEWO_SLEEP,
         lambda: draw_widget_maybe(queue, mewo.sleep()),
     )
-    scheduler.daily(datetime.time(hour=7, minute=0), lambda: mewo.awake())
+    windows.add_daily(MEWO_SLEEP)
+    scheduler.daily(MEWO_AWAKE, wake_mewo, args=(mewo,))
+    schedule_mewo_tick(scheduler, windows, queue, mewo, tick)
     logger.info("Mewo scheduling complete")
 
 
 async def schedule_sunrise_sunset(
-    scheduler: Scheduler, queue: Queue[Widget], latitude: float, longitude: float
+    scheduler: Scheduler, windows: RefreshWindows, queue: Queue[Widget], latitude: float, longitude: float
 ) -> None:
     logger.debug("Computing next sunrise/sunset for lat=%s lon=%s", latitude, longitude)
     sunrise = get_next_sunrise(latitude, longitude)
     sunset = get_next_sunset(latitude, longitude)
     logger.info("Next sunrise: %s, sunset: %s", sunrise, sunset)
+    sunrise = windows.align(sunrise, SUN_TOLERANCE)
+    sunset = windows.align(sunset, SUN_TOLERANCE)
 
     scheduler.once(
         sunrise,
@@ -117,7 +224,7 @@ async def schedule_sunrise_sunset(
     scheduler.once(
         reset,
         schedule_sunrise_sunset,
-        args=(scheduler, queue, latitude, longitude),
+        args=(scheduler, windows, queue, latitude, longitude),
     )
     logger.debug(f"Scheduled recursive sunrise/sunset update check at {reset=}")
 
@@ -128,51 +235,96 @@ async def schedule_sunrise_sunset(
     logger.debug(f"Scheduled night mode at {sunset=}")
 
 
-def schedule_bert(scheduler: Scheduler, queue: Queue[Widget]) -> None:
-    scheduler.daily(datetime.time(hour=0, minute=0, second=0), lambda: draw_widget_maybe(queue, get_bert()))
+async def fetch_weather(
+    scheduler: Scheduler, queue: Queue[Widget], latitude: float, longitude: float, retry: datetime.timedelta
+) -> None:
+    # At boot the network is often not up yet; keep trying, backing off, until one fetch gets through.
+    try:
+        widget = await get_weather(latitude, longitude)
+    except Exception:
+        at = datetime.datetime.now() + retry
+        logger.warning("Weather fetch failed, retrying at %s", at, exc_info=True)
+        backoff = min(retry * 2, WEATHER_RETRY_MAX)
+        scheduler.once(at, fetch_weather, args=(scheduler, queue, latitude, longitude, backoff))
+        return
+    await queue.put(widget)
+
+
+def schedule_clock(scheduler: Scheduler, queue: Queue[Widget]) -> None:
+    # Every minute, but it only touches its own small region, which the panel takes as a partial refresh.
+    scheduler.minutely(CLOCK_TICK, lambda: draw_widget_maybe(queue, tick_clock()))
 
 
-async def run_scheduler(queue: Queue[Widget], latitude: float, longitude: float):
+def schedule_bert(scheduler: Scheduler, windows: RefreshWindows, queue: Queue[Widget]) -> None:
+    scheduler.daily(MIDNIGHT, lambda: draw_widget_maybe(queue, get_bert()))
+    windows.add_daily(MIDNIGHT)
+
+
+async def report_windows(windows: RefreshWindows) -> None:
+    windows.report()
+
+
+async def run_scheduler(
+    queue: Queue[Widget], latitude: float, longitude: float, mewo: Mewo, scheduler: Scheduler | None = None
+):
     logger.debug("Starting scheduler")
-    scheduler = Scheduler()
-    schedule_mewo(scheduler, queue)
-    schedule_bert(scheduler, queue)
-    await schedule_sunrise_sunset(scheduler, queue, latitude, longitude)
+    scheduler = scheduler or Scheduler()
+    windows = RefreshWindows()
+    schedule_bert(scheduler, windows, queue)
+    schedule_clock(scheduler, queue)
+    schedule_mewo(scheduler, windows, queue, mewo)
+    await schedule_sunrise_sunset(scheduler, windows, queue, latitude, longitude)
+    scheduler.daily(datetime.time(hour=23, minute=59, second=59), report_windows, args=(windows,))
+    # Fresh weather replaces the cached layer in a later frame once the network answers.
+    await fetch_weather(scheduler, queue, latitude, longitude, WEATHER_RETRY)
 
     logger.info("Scheduler running")
     logger.info(scheduler)
-    while True:
-        await asyncio.sleep(1)
+    # Jobs run as the scheduler's own tasks; waking every second to do nothing only costs power.
+    await asyncio.Event().wait()
 
 
-async def initialise(latitude: float, longitude: float) -> list[Widget]:
+async def initialise(latitude: float, longitude: float, mewo: Mewo) -> list[Widget]:
     logger.debug("Initialising widgets")
-    with resources.open_binary(bedside, "assets", "background.bmp") as f:
-        background_image = Image.open(f).convert("RGBA")
-    background_widget = Widget(bw=background_image, name="background", z=-100)
+    background_widget = Widget(bw=await offload(load_sprite, "background.bmp"), name="background", z=-100)
     logger.info("Background widget loaded")
 
-    mewo = Mewo().random()
+    # A restored Mewo keeps its pose, so a restart can recompose the frame the panel still shows.
+    mewo_pose = mewo.current() if mewo.state else mewo.random()
     widgets = [background_widget]
-    if mewo:
-        logger.info("Adding Mewo widget: %s", mewo.name)
-        widgets.append(mewo)
-
-    weather = await get_weather(latitude, longitude)
-    logger.info("Initial weather widget: %s", weather.name)
-    widgets.append(weather)
-
-    widgets.append(get_bert())
+    if mewo_pose:
+        mewo_widget = await mewo_pose
+        logger.info("Adding Mewo widget: %s", mewo_widget.name)
+        widgets.append(mewo_widget)
+
+    # The network may be slow or down; the first frame goes out with the last weather seen, if any.
+    weather = await get_cached_weather(latitude, longitude)
+    if weather:
+        logger.info("Initial weather widget from cache: %s", weather.name)
+        widgets.append(weather)
+
+    widgets.append(await get_bert())
     logger.info("Adding bert widget")
+    widgets.append(get_clock())
     logger.debug("Initial widgets prepared: %s", [w.name for w in widgets])
     return widgets
 
 
-async def main(latitude: float, longitude: float):
+async def main(
+    latitude: float, longitude: float, sink: FrameSink, name: str = "bedside", scheduler: Scheduler | None = None
+):
     logger.info("Starting main with lat=%s lon=%s", latitude, longitude)
+    started = time.monotonic()
     queue = Queue(10)
-    event_loop = asyncio.create_task(process_event_loop(queue, await initialise(latitude, longitude)))
-    scheduler_task = asyncio.create_task(run_scheduler(queue, latitude, longitude))
+    mewo = Mewo.restore(name)
+    if mewo.asleep and MEWO_AWAKE <= datetime.datetime.now().time() < MEWO_SLEEP:
+        # Restarted after the morning wake-up it missed.
+        mewo.awake()
+    initial = await initialise(latitude, longitude, mewo)
+    sink = saving_mewo(timed_first_frame(sink, started), mewo, name)
+    history = await asyncio.to_thread(FrameHistory, name)
+    event_loop = asyncio.create_task(process_event_loop(queue, initial, sink, history=history))
+    scheduler_task = asyncio.create_task(run_scheduler(queue, latitude, longitude, mewo, scheduler))
 
     try:
         await asyncio.gather(event_loop, scheduler_task)
@@ -181,6 +333,28 @@ async def main(latitude: float, longitude: float):
         raise
 
 
+async def main_server(address: str, displays: list[tuple[str, float, float]]):
+    logger.info("Starting frame server on %s for %s", address, [name for name, _, _ in displays])
+    store = FrameStore()
+    runner = await serve(store, address)
+    try:
+        await asyncio.gather(
+            *(main(latitude, longitude, store_sink(store, name), name) for name, latitude, longitude in displays)
+        )
+    finally:
+        await runner.cleanup()
+
+
+async def main_client(address: str, name: str):
+    logger.info("Starting thin client for '%s' from %s", name, address)
+    await poll_frames(address, name, epd_sink())
+
+
+def parse_display(value: str) -> tuple[str, float, float]:
+    name, latitude, longitude = value.split(":")
+    return name, float(latitude), float(longitude)
+
+
 if __name__ == "__main__":
     logging.basicConfig(
         level=logging.DEBUG,
@@ -188,14 +362,65 @@ if __name__ == "__main__":
     )
 
     parser = argparse.ArgumentParser(prog="bedside", description="Bedside room display")
-    parser.add_argument("latitude", type=float)
-    parser.add_argument("longitude", type=float)
+    parser.add_argument("latitude", type=float, nargs="?")
+    parser.add_argument("longitude", type=float, nargs="?")
+    parser.add_argument("--name", default="bedside", help="Display name frames are published under")
+    parser.add_argument(
+        "--serve", metavar="ADDRESS", help="Render centrally and serve frames on HOST:PORT or unix:PATH"
+    )
+    parser.add_argument(
+        "--display",
+        metavar="NAME:LAT:LON",
+        type=parse_display,
+        action="append",
+        default=[],
+        help="Additional display to render in server mode",
+    )
+    parser.add_argument("--client", metavar="URL", help="Show frames from a frame server at URL or unix:PATH")
+    parser.add_argument(
+        "--dither",
+        type=Dither,
+        choices=list(Dither),
+        default=get_default(),
+        help="How sprites are converted to 1-bit planes",
+    )
+    parser.add_argument(
+        "--executor",
+        type=ExecutorKind,
+        choices=list(ExecutorKind),
+        default=ExecutorKind.THREAD,
+        help="Pool that decodes assets and composites frames",
+    )
+    parser.add_argument("--workers", type=int, help="Size of the rendering pool")
+    parser.add_argument("--trace", type=Path, metavar="FILE", help="Record EPD bus traffic to FILE")
     args = parser.parse_args()
+    if args.client is None and (args.latitude is None or args.longitude is None) and not args.display:
+        parser.error("latitude and longitude are required unless running as a client")
+    if args.display and args.serve is None:
+        parser.error("--display requires --serve")
+    if args.trace and args.serve:
+        parser.error("--trace needs a local panel")
+
     random.seed()
+    set_default(args.dither)
+    configure(args.executor, args.workers)
     try:
-        asyncio.run(main(args.latitude, args.longitude))
+        with record(args.trace) if args.trace else nullcontext():
+            if args.client:
+                asyncio.run(main_client(args.client, args.name))
+            elif args.serve:
+                displays = list(args.display)
+                if args.latitude is not None and args.longitude is not None:
+                    displays.insert(0, (args.name, args.latitude, args.longitude))
+                asyncio.run(main_server(args.serve, displays))
+            else:
+                asyncio.run(main(args.latitude, args.longitude, epd_sink(), args.name))
     except Exception as e:
         logger.exception("Bailing due to fatal error")
     finally:
-        logger.info("Closing EPD")
-        epd7in5b_V2.epdconfig.module_exit(cleanup=True)
+        shutdown()
+        if not args.serve:
+            from bedside import epd7in5b_V2
+
+            logger.info("Closing EPD")
+            epd7in5b_V2.epdconfig.module_exit(cleanup=True)
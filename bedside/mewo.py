@@ -1,12 +1,11 @@
-from dataclasses import dataclass
+from collections.abc import Awaitable
+from dataclasses import dataclass, field
 from enum import StrEnum
-from importlib import resources
 from random import choice
 
-from PIL import Image
-from widget import Widget
-
-import bedside
+from bedside.executor import offload
+from bedside.state import load_json, save_json
+from bedside.widget import Widget, load_sprite
 
 _MEWO_WIDGET = "mewo"
 
@@ -17,10 +16,12 @@ class MewoState(StrEnum):
     floor = "floor"
 
 
+def _state_file(name: str) -> str:
+    return f"mewo/{name}.json"
+
+
 def _mewo_img(state: MewoState, z: int) -> Widget:
-    with resources.open_binary(bedside, "assets", "mewo", f"{state}.bmp") as f:
-        mewo = Image.open(f).convert(mode="RGBA")
-    return Widget(name=_MEWO_WIDGET, z=z, bw=mewo)
+    return Widget(name=_MEWO_WIDGET, z=z, bw=load_sprite("mewo", f"{state}.bmp"))
 
 
 @dataclass
@@ -28,11 +29,33 @@ class Mewo:
     z: int = -99
     state: MewoState | None = None
     asleep: bool = False
+    # What the state file holds, so saving after every frame only writes when Mewo has moved.
+    _saved: tuple[MewoState | None, bool] | None = field(default=None, init=False, repr=False, compare=False)
+
+    # Each display has a Mewo of its own, kept under mewo/NAME.json in the state directory.
+    @classmethod
+    def restore(cls, name: str) -> "Mewo":
+        saved = load_json(_state_file(name)) or {}
+        state = saved.get("state")
+        mewo = cls(state=MewoState(state) if state else None, asleep=saved.get("asleep", False))
+        mewo._saved = (mewo.state, mewo.asleep)
+        return mewo
+
+    def save(self, name: str) -> None:
+        if (self.state, self.asleep) == self._saved:
+            return
+        save_json(_state_file(name), {"state": self.state, "asleep": self.asleep})
+        self._saved = (self.state, self.asleep)
+
+    def current(self) -> Awaitable[Widget] | None:
+        if self.state is not None:
+            return offload(_mewo_img, self.state, self.z)
 
-    def sleep(self) -> Widget | None:
+    # State changes happen immediately; only loading the sprite is deferred to the executor pool.
+    def sleep(self) -> Awaitable[Widget] | None:
         if self.asleep:
             return
-        new = _mewo_img(MewoState.SLEEP, self.z) if self.state != MewoState.SLEEP else None
+        new = offload(_mewo_img, MewoState.SLEEP, self.z) if self.state != MewoState.SLEEP else None
         self.state = MewoState.SLEEP
         self.asleep = True
         return new
@@ -40,7 +63,7 @@ class Mewo:
     def awake(self) -> None:
         self.asleep = False
 
-    def random(self) -> Widget | None:
+    def random(self) -> Awaitable[Widget] | None:
         if not self.asleep:
             self.state = choice(list(MewoState))
-            return _mewo_img(self.state, self.z)
+            return offload(_mewo_img, self.state, self.z)
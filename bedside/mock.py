@@ -1,3 +1,5 @@
+from functools import partial
+
 from PIL import Image
 
 
@@ -43,3 +45,81 @@ class MockEPD:
 
     def sleep(self):
         print("MockEPD sleep")
+
+
+class MockDevConfig:
+    # Stands in for DEV_Config_*.so, counting the bytes that would have gone over the bus.
+
+    def __init__(self):
+        self.sent = 0
+        # devspi.load sets argtypes and restype as on a CDLL's functions, which bound methods refuse.
+        for name in [name for name in dir(self) if name.startswith("DEV_")]:
+            setattr(self, name, partial(getattr(self, name)))
+
+    def DEV_Module_Init(self):
+        print("MockDevConfig init")
+        return 0
+
+    def DEV_Module_Exit(self):
+        print("MockDevConfig exit")
+
+    def DEV_SPI_SendData(self, data):
+        self.sent += 1
+
+    def DEV_SPI_SendnData(self, data, length):
+        self.sent += len(bytes(data)[:length])
+
+    def DEV_SPI_ReadData(self):
+        return 0
+
+
+class MockBus:
+    # Stands in for the epdconfig module at bus level: pins, SPI and delays, without sleeping.
+    # The data bytes following each command are kept, so the panel RAM a driver last wrote can be checked.
+
+    RST_PIN = 17
+    DC_PIN = 25
+    CS_PIN = 8
+    BUSY_PIN = 24
+    PWR_PIN = 18
+
+    def __init__(self):
+        self.pins = {}
+        self.sent = 0
+        self.delayed = 0.0
+        self.commands = 0
+        self.command = None
+        self.data = {}
+
+    def digital_write(self, pin, value):
+        self.pins[pin] = value
+
+    def digital_read(self, pin):
+        # The panel is never busy: BUSY reads high.
+        return 1 if pin == self.BUSY_PIN else self.pins.get(pin, 0)
+
+    def delay_ms(self, delaytime):
+        self.delayed += delaytime / 1000.0
+
+    def spi_writebyte(self, data):
+        self._receive(bytes(data))
+
+    def spi_writebyte2(self, data):
+        self._receive(bytes(data))
+
+    def _receive(self, data):
+        self.sent += len(data)
+        if self.pins.get(self.DC_PIN):
+            if self.command is not None:
+                self.data[self.command].extend(data)
+        else:
+            self.commands += len(data)
+            for command in data:
+                self.command = command
+                self.data[command] = bytearray()
+
+    def module_init(self, cleanup=False):
+        return 0
+
+    def module_exit(self, close=True, cleanup=False):
+        pass
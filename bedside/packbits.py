@@ -0,0 +1,39 @@
+import re
+
+# A run is three or more identical bytes; anything shorter is cheaper as a literal.
+_RUN = re.compile(rb"(.)\1{2,127}", re.DOTALL)
+_MAX_LITERAL = 128
+
+
+def _literal(out: bytearray, data: bytes) -> None:
+    for start in range(0, len(data), _MAX_LITERAL):
+        chunk = data[start : start + _MAX_LITERAL]
+        out.append(len(chunk) - 1)
+        out += chunk
+
+
+def encode(data: bytes) -> bytes:
+    out = bytearray()
+    position = 0
+    for run in _RUN.finditer(data):
+        _literal(out, data[position : run.start()])
+        out.append(257 - len(run.group()))
+        out += run.group(1)
+        position = run.end()
+    _literal(out, data[position:])
+    return bytes(out)
+
+
+def decode(data: bytes) -> bytes:
+    out = bytearray()
+    position = 0
+    while position < len(data):
+        header = data[position]
+        position += 1
+        if header < 128:
+            out += data[position : position + header + 1]
+            position += header + 1
+        elif header > 128:
+            out += data[position : position + 1] * (257 - header)
+            position += 1
+    return bytes(out)
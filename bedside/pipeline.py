@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from bedside.frame import Frame
+from bedside.history import FrameHistory
+
+logger = logging.getLogger(__name__)
+
+FrameSink = Callable[[Frame], Awaitable[None]]
+
+
+@dataclass
+class PipelineMetrics:
+    started: float = field(default_factory=time.monotonic)
+    submitted: int = 0
+    pushed: int = 0
+    superseded: int = 0
+    unchanged: int = 0
+    # Seconds the device spent taking frames, and seconds a composed frame sat in the ready slot.
+    device_busy: float = 0.0
+    slot_full: float = 0.0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def occupancy(self, now: float | None = None) -> tuple[float, float]:
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        return self.device_busy / elapsed, self.slot_full / elapsed
+
+    def __str__(self) -> str:
+        device, slot = self.occupancy()
+        average = self.total_wait / self.pushed if self.pushed else 0.0
+        return (
+            f"pushed {self.pushed}/{self.submitted} frames ({self.superseded} superseded, {self.unchanged} unchanged), "
+            f"device busy {device:.1%}, ready slot full {slot:.1%}, "
+            f"frame wait avg {average:.2f}s max {self.max_wait:.2f}s"
+        )
+
+
+class FramePipeline:
+    # Two slots: the frame the device is taking and the latest composed frame waiting for it.
+    # Composing never waits on the device; a newer frame replaces one that has not been pushed yet.
+
+    def __init__(self, sink: FrameSink, history: FrameHistory | None = None) -> None:
+        self._sink = sink
+        self._history = history
+        self._ready: Frame | None = None
+        self._ready_at = 0.0
+        self._filled_at = 0.0
+        self._available = asyncio.Event()
+        self.shown: Frame | None = None
+        self.metrics = PipelineMetrics()
+
+    def submit(self, frame: Frame) -> None:
+        now = time.monotonic()
+        self.metrics.submitted += 1
+        if self._ready is None:
+            self._filled_at = now
+        else:
+            logger.debug("Frame %s superseded by %s before reaching the device", self._ready.etag, frame.etag)
+            self.metrics.superseded += 1
+        self._ready = frame
+        self._ready_at = now
+        self._available.set()
+
+    async def run(self) -> None:
+        while True:
+            await self._available.wait()
+            self._available.clear()
+            frame, self._ready = self._ready, None
+            if frame is None:
+                continue
+            start = time.monotonic()
+            wait = start - self._ready_at
+            self.metrics.slot_full += start - self._filled_at
+            if self.shown is not None and frame.etag == self.shown.etag:
+                logger.debug("Frame %s is already on the device", frame.etag)
+                self.metrics.unchanged += 1
+                continue
+            self.metrics.total_wait += wait
+            self.metrics.max_wait = max(self.metrics.max_wait, wait)
+            try:
+                await self._sink(frame)
+                self.shown = frame
+                self.metrics.pushed += 1
+            except Exception:
+                logger.exception("Error pushing frame %s", frame.etag)
+                continue
+            finally:
+                self.metrics.device_busy += time.monotonic() - start
+            logger.info("Frame %s pushed after waiting %.2fs; pipeline %s", frame.etag, wait, self.metrics)
+            if self._history is not None and self._history.wants(frame):
+                timings = {"wait": wait, "push": time.monotonic() - start}
+                await asyncio.to_thread(self._history.append, frame, timings)
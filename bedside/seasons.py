@@ -1,11 +1,8 @@
 import datetime
 from enum import Enum, auto
-from importlib import resources
 
-from PIL import Image
-from widget import Widget
-
-import bedside
+from bedside.executor import offload
+from bedside.widget import Widget, load_sprite
 
 
 class Season(Enum):
@@ -31,10 +28,12 @@ def get_season(now: datetime.date | None = None) -> Season:
 _BERT_WIDGET = "bert"
 
 
-def get_bert() -> Widget:
+def _bert_img(name: str) -> Widget:
+    return Widget(name=_BERT_WIDGET, z=-99, bw=load_sprite("bert", f"{name}.bmp"))
+
+
+async def get_bert() -> Widget:
     season = get_season()
     name_lookup = {Season.AUTUMN: "leafless", Season.WINTER: "leafless", Season.SPRING: "bloom", Season.SUMMER: "bloom"}
     name = name_lookup[season]
-    with resources.open_binary(bedside, "assets", "bert", f"{name}.bmp") as f:
-        bert = Image.open(f).convert(mode="RGBA")
-    return Widget(name=_BERT_WIDGET, z=-99, bw=bert)
+    return await offload(_bert_img, name)
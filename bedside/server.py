@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import logging
+
+from aiohttp import web
+
+from bedside.frame import Frame
+
+logger = logging.getLogger(__name__)
+
+FRAME_CONTENT_TYPE = "application/x-bedside-frame"
+PLANE_ENCODING = "packbits"
+MAX_WAIT = 600.0
+
+
+class FrameStore:
+    def __init__(self) -> None:
+        self._frames: dict[str, tuple[Frame, bytes, bytes]] = {}
+        self._changed = asyncio.Condition()
+
+    def names(self) -> list[str]:
+        return sorted(self._frames)
+
+    async def publish(self, name: str, frame: Frame) -> None:
+        black, red = frame.encode()
+        logger.info(
+            "Publishing frame %s for '%s' (%d + %d bytes packed)",
+            frame.etag,
+            name,
+            len(black),
+            len(red),
+        )
+        async with self._changed:
+            self._frames[name] = (frame, black, red)
+            self._changed.notify_all()
+
+    def _changed_since(self, name: str, etag: str | None) -> bool:
+        entry = self._frames.get(name)
+        return entry is not None and entry[0].etag != etag
+
+    async def wait(self, name: str, etag: str | None, timeout: float) -> tuple[Frame, bytes, bytes] | None:
+        async with self._changed:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._changed.wait_for(lambda: self._changed_since(name, etag)), timeout)
+            return self._frames.get(name)
+
+
+def _requested_etag(request: web.Request) -> str | None:
+    etag = request.headers.get("If-None-Match")
+    return etag.strip('"') if etag else None
+
+
+def create_app(store: FrameStore) -> web.Application:
+    async def get_frame(request: web.Request) -> web.StreamResponse:
+        name = request.match_info["name"]
+        etag = _requested_etag(request)
+        try:
+            wait = min(float(request.query.get("wait", "0")), MAX_WAIT)
+        except ValueError:
+            raise web.HTTPBadRequest(text="wait must be a number of seconds") from None
+
+        entry = await store.wait(name, etag, wait)
+        if entry is None:
+            raise web.HTTPNotFound(text=f"No frame for display '{name}'")
+        frame, black, red = entry
+        headers = {
+            "ETag": f'"{frame.etag}"',
+            "X-Frame-Size": f"{frame.width}x{frame.height}",
+            "X-Plane-Encoding": PLANE_ENCODING,
+            "X-Black-Length": str(len(black)),
+        }
+        if frame.etag == etag:
+            raise web.HTTPNotModified(headers=headers)
+        return web.Response(body=black + red, content_type=FRAME_CONTENT_TYPE, headers=headers)
+
+    async def list_displays(request: web.Request) -> web.StreamResponse:
+        return web.json_response(store.names())
+
+    app = web.Application()
+    app.router.add_get("/displays", list_displays)
+    app.router.add_get("/displays/{name}/frame", get_frame)
+    return app
+
+
+async def serve(store: FrameStore, address: str) -> web.AppRunner:
+    runner = web.AppRunner(create_app(store))
+    await runner.setup()
+    if address.startswith("unix:"):
+        site: web.BaseSite = web.UnixSite(runner, address.removeprefix("unix:"))
+    else:
+        host, _, port = address.rpartition(":")
+        site = web.TCPSite(runner, host or None, int(port))
+    await site.start()
+    logger.info("Serving frames on %s", site.name)
+    return runner
@@ -0,0 +1,341 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import math
+import os
+import random
+import resource
+import selectors
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any
+
+from aiohttp import web
+from scheduler.asyncio import Scheduler
+from scheduler.asyncio.job import Job
+
+from bedside.executor import shutdown
+from bedside.frame import Frame
+from bedside.pipeline import FrameSink
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+# Real seconds to let in-flight socket traffic land before the clock jumps to the next timer.
+GRACE = 0.001
+# The virtual clock starts at this time of day.
+NOON = datetime.time(hour=12)
+# WMO codes the stub weather server cycles through, one per day.
+WMO_CODES = [0, 2, 3, 61]
+
+
+class VirtualClock:
+    # Wall clock and loop clock of the soak, both starting at `start`. Real time passes on it as usual, and
+    # when the loop is idle it jumps to the next timer; time spent in callbacks and on worker threads is
+    # therefore still charged, and a blocked loop shows up as late jobs.
+
+    def __init__(self, start: datetime.datetime) -> None:
+        self.start = start
+        self.skipped = 0.0
+        self._origin = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._origin + self.skipped
+
+    def advance(self, seconds: float) -> None:
+        self.skipped += seconds
+
+    def now(self) -> datetime.datetime:
+        return self.start + datetime.timedelta(seconds=self.elapsed)
+
+
+_real_datetime = datetime.datetime
+_real_date = datetime.date
+
+
+class _Instance(type):
+    # The scheduler type-checks its arguments against datetime.datetime, which now names the virtual class.
+    def __instancecheck__(cls, instance: object) -> bool:
+        return isinstance(instance, cls.__mro__[1])
+
+
+def _virtual_datetime_module(clock: VirtualClock) -> ModuleType:
+    class VirtualDateTime(_real_datetime, metaclass=_Instance):
+        @classmethod
+        def now(cls, tz: datetime.tzinfo | None = None) -> datetime.datetime:
+            now = clock.now()
+            return now.astimezone(tz) if tz else now
+
+        @classmethod
+        def today(cls) -> datetime.datetime:
+            return cls.now()
+
+    class VirtualDate(_real_date, metaclass=_Instance):
+        @classmethod
+        def today(cls) -> datetime.date:
+            return clock.now().date()
+
+    module = ModuleType("datetime")
+    module.__dict__.update(vars(datetime))
+    module.datetime = VirtualDateTime
+    module.date = VirtualDate
+    return module
+
+
+@contextmanager
+def virtual_datetime(clock: VirtualClock, prefixes: tuple[str, ...] = ("bedside.", "scheduler.")) -> Iterator[None]:
+    # datetime.datetime.now cannot be replaced, so modules that read the clock get a datetime module of their own
+    # until the soak is over. Only modules already imported are patched.
+    virtual = _virtual_datetime_module(clock)
+    patched = []
+    for name, module in list(sys.modules.items()):
+        if name.startswith(prefixes) and name != __name__:
+            for attribute, value in list(vars(module).items()):
+                if value is datetime:
+                    setattr(module, attribute, virtual)
+                    patched.append((module, attribute))
+    try:
+        yield
+    finally:
+        for module, attribute in patched:
+            setattr(module, attribute, datetime)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    def __init__(self, loop: "VirtualLoop") -> None:
+        super().__init__()
+        self._loop = loop
+
+    def select(self, timeout: float | None = None) -> list:
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if self._loop.pending or timeout is None:
+            # Real work is running on a thread (or there is nothing else to wait for): wait for it for real.
+            return super().select(1.0 if timeout is None else min(timeout, 1.0))
+        waited = time.monotonic()
+        if events := super().select(GRACE):
+            return events
+        # The grace period has already passed on the clock.
+        self._loop.clock.advance(max(timeout - (time.monotonic() - waited), 0.0))
+        return []
+
+
+class VirtualLoop(asyncio.SelectorEventLoop):
+    # Runs on a virtual clock: whenever nothing is ready it jumps straight to the next timer.
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self.clock = clock
+        self.pending = 0
+        super().__init__(_VirtualSelector(self))
+
+    def time(self) -> float:
+        return self.clock.elapsed
+
+    def run_in_executor(self, executor, func, *args) -> asyncio.Future:
+        future = super().run_in_executor(executor, func, *args)
+        self.pending += 1
+        future.add_done_callback(self._executor_done)
+        return future
+
+    def _executor_done(self, _: asyncio.Future) -> None:
+        self.pending -= 1
+
+
+def forecast(clock: VirtualClock) -> Callable[[web.Request], Awaitable[web.Response]]:
+    # Enough of Open-Meteo's forecast endpoint for get_weather_code, including multi-location requests.
+    async def handle(request: web.Request) -> web.Response:
+        latitudes = request.query["latitude"].split(",")
+        day = clock.now().toordinal()
+        forecasts = [
+            {"daily": {"weather_code": [WMO_CODES[(day + index) % len(WMO_CODES)]]}} for index in range(len(latitudes))
+        ]
+        return web.json_response(forecasts if len(forecasts) > 1 else forecasts[0])
+
+    return handle
+
+
+async def stub_weather_server(clock: VirtualClock) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_get("/v1/forecast", forecast(clock))
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}/v1/forecast"
+
+
+@dataclass
+class SoakReport:
+    # Refreshes by soak day, counted from the start rather than by calendar date.
+    refreshes: Counter[int] = field(default_factory=Counter)
+    tasks: list[int] = field(default_factory=list)
+    lateness: list[float] = field(default_factory=list)
+    baseline: int = 0
+    growth: int = 0
+
+    def __str__(self) -> str:
+        per_day = [self.refreshes[day] for day in range(len(self.tasks))]
+        late = max(self.lateness, default=0.0)
+        average = sum(self.lateness) / len(self.lateness) if self.lateness else 0.0
+        return "\n".join([
+            f"days              {len(self.tasks)}",
+            f"refreshes per day min {min(per_day, default=0)} max {max(per_day, default=0)} "
+            f"avg {sum(per_day) / max(len(per_day), 1):.1f}",
+            f"peak RSS          {peak_rss() / 2**20:.1f} MiB",
+            f"tracemalloc growth {self.growth / 2**10:.1f} KiB after day 1",
+            f"tasks             {self.tasks[0] if self.tasks else 0} after day 1, "
+            f"{self.tasks[-1] if self.tasks else 0} at the end, max {max(self.tasks, default=0)}",
+            f"scheduler late    avg {average:.3f}s max {late:.3f}s over {len(self.lateness)} jobs",
+        ])
+
+
+def peak_rss() -> int:
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def counting(sink: FrameSink, report: SoakReport) -> FrameSink:
+    async def show(frame: Frame) -> None:
+        await sink(frame)
+        report.refreshes[int(asyncio.get_running_loop().time() // DAY)] += 1
+
+    return show
+
+
+class MeasuredScheduler(Scheduler):
+    # Each job's handle is wrapped as it is scheduled, recording how long after its planned time the job ran.
+
+    def __init__(self, clock: VirtualClock, report: SoakReport) -> None:
+        super().__init__()
+        self._clock = clock
+        self._report = report
+
+    def _measured(
+        self, schedule: Callable[..., Job], timing: Any, handle: Callable[..., Awaitable[None]], **kwargs: Any
+    ) -> Job:
+        job: Job | None = None
+
+        async def measured(*args: Any, **handle_kwargs: Any) -> None:
+            self._report.lateness.append((self._clock.now() - job.datetime).total_seconds())
+            await handle(*args, **handle_kwargs)
+
+        # Listed under the handle's own name rather than the wrapper's.
+        kwargs.setdefault("alias", getattr(handle, "__qualname__", None))
+        job = schedule(timing, measured, **kwargs)
+        return job
+
+    def once(self, timing, handle, **kwargs) -> Job:
+        return self._measured(super().once, timing, handle, **kwargs)
+
+    def cyclic(self, timing, handle, **kwargs) -> Job:
+        return self._measured(super().cyclic, timing, handle, **kwargs)
+
+    def minutely(self, timing, handle, **kwargs) -> Job:
+        return self._measured(super().minutely, timing, handle, **kwargs)
+
+    def hourly(self, timing, handle, **kwargs) -> Job:
+        return self._measured(super().hourly, timing, handle, **kwargs)
+
+    def daily(self, timing, handle, **kwargs) -> Job:
+        return self._measured(super().daily, timing, handle, **kwargs)
+
+    def weekly(self, timing, handle, **kwargs) -> Job:
+        return self._measured(super().weekly, timing, handle, **kwargs)
+
+
+def emulate_epd() -> None:
+    # The driver reaches the hardware only through the epdconfig module, so the bus emulator takes its place.
+    from bedside.mock import MockBus
+
+    sys.modules["bedside.epdconfig"] = MockBus()
+
+
+async def soak(clock: VirtualClock, days: float, latitude: float, longitude: float, report: SoakReport) -> None:
+    from bedside.main import epd_sink, main
+
+    runner, url = await stub_weather_server(clock)
+    os.environ["BEDSIDE_WEATHER_URL"] = url
+    scheduler = MeasuredScheduler(clock, report)
+    flow = asyncio.create_task(main(latitude, longitude, counting(epd_sink(), report), scheduler=scheduler))
+    loop = asyncio.get_running_loop()
+    try:
+        for day in range(math.ceil(days)):
+            await asyncio.sleep(min(DAY, days * DAY - loop.time()))
+            if flow.done():
+                flow.result()
+            current, _ = tracemalloc.get_traced_memory()
+            if day == 0:
+                report.baseline = current
+            report.growth = current - report.baseline
+            report.tasks.append(len(asyncio.all_tasks()))
+            logger.warning(
+                "Day %d: %d refreshes, %d tasks, %.1f MiB traced, %.1f MiB peak RSS",
+                day + 1,
+                report.refreshes[day],
+                report.tasks[-1],
+                current / 2**20,
+                peak_rss() / 2**20,
+            )
+    finally:
+        # The scheduler's job tasks outlive main(), so everything still running goes.
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await runner.cleanup()
+
+
+def run(days: float, latitude: float, longitude: float, start: datetime.datetime) -> SoakReport:
+    # Everything that reads the clock has to be imported before it is patched.
+    import bedside.main  # noqa: F401
+
+    clock = VirtualClock(start)
+    report = SoakReport()
+    loop = VirtualLoop(clock)
+    try:
+        with virtual_datetime(clock):
+            loop.run_until_complete(soak(clock, days, latitude, longitude, report))
+    finally:
+        shutdown()
+        loop.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="bedside.soak", description="Run the display for days on a virtual clock")
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--latitude", type=float, default=51.5)
+    parser.add_argument("--longitude", type=float, default=-0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-growth", type=float, metavar="KIB", help="Fail if traced memory grows more than this")
+    parser.add_argument("--max-tasks", type=int, help="Fail if more tasks than this are alive at the end")
+    parser.add_argument("--max-late", type=float, metavar="SECONDS", help="Fail if a scheduled job ran later than this")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    random.seed(args.seed)
+    os.environ.setdefault("BEDSIDE_STATE_DIR", tempfile.mkdtemp(prefix="bedside-soak-"))
+    emulate_epd()
+    tracemalloc.start()
+    started = time.perf_counter()
+    report = run(args.days, args.latitude, args.longitude, datetime.datetime.combine(datetime.date.today(), NOON))
+    print(f"Soaked {args.days} days in {time.perf_counter() - started:.1f}s")
+    print(report)
+    if args.max_growth is not None and report.growth > args.max_growth * 2**10:
+        sys.exit(f"Traced memory grew {report.growth / 2**10:.1f} KiB, limit {args.max_growth} KiB")
+    if args.max_tasks is not None and report.tasks and report.tasks[-1] > args.max_tasks:
+        sys.exit(f"{report.tasks[-1]} tasks alive at the end, limit {args.max_tasks}")
+    if args.max_late is not None and max(report.lateness, default=0.0) > args.max_late:
+        sys.exit(f"A scheduled job ran {max(report.lateness):.3f}s late, limit {args.max_late}s")
@@ -0,0 +1,42 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Where state that should survive a restart lives; defaults to $XDG_STATE_HOME/bedside.
+STATE_DIR_ENV = "BEDSIDE_STATE_DIR"
+
+
+def state_dir() -> Path:
+    if directory := os.environ.get(STATE_DIR_ENV):
+        return Path(directory)
+    return Path(os.environ.get("XDG_STATE_HOME") or Path.home() / ".local" / "state") / "bedside"
+
+
+def write_atomic(name: str | Path, data: bytes) -> None:
+    # Written alongside and renamed over, so a crash or power cut never leaves half a file behind.
+    path = state_dir() / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.partial")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+
+
+def load_json(name: str) -> Any | None:
+    try:
+        return json.loads((state_dir() / name).read_text())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable state file %s", name, exc_info=True)
+        return None
+
+
+def save_json(name: str, value: Any) -> None:
+    try:
+        write_atomic(name, json.dumps(value).encode())
+    except OSError:
+        logger.warning("Could not save state file %s", name, exc_info=True)
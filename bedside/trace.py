@@ -0,0 +1,293 @@
+import argparse
+import io
+import logging
+import struct
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, BinaryIO
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BDTR"
+VERSION = 1
+# magic, version, busy pin, data/command pin
+_HEADER = struct.Struct("<4sHBB")
+# op, start in ns since the trace began, duration in ns
+_RECORD = struct.Struct("<BQI")
+_PIN = struct.Struct("<BB")
+_LENGTH = struct.Struct("<I")
+_DELAY = struct.Struct("<f")
+# How long a replay waits for the panel to finish; a full refresh takes about 20s.
+BUSY_TIMEOUT = 60.0
+BUSY_POLL_MS = 10
+
+
+class Op(IntEnum):
+    DIGITAL_WRITE = 1
+    DIGITAL_READ = 2
+    SPI_WRITEBYTE = 3
+    SPI_WRITEBYTE2 = 4
+    DELAY_MS = 5
+
+
+TRACED = {
+    Op.DIGITAL_WRITE: "digital_write",
+    Op.DIGITAL_READ: "digital_read",
+    Op.SPI_WRITEBYTE: "spi_writebyte",
+    Op.SPI_WRITEBYTE2: "spi_writebyte2",
+    Op.DELAY_MS: "delay_ms",
+}
+
+
+@dataclass(frozen=True)
+class Pins:
+    busy: int
+    dc: int
+
+
+@dataclass(frozen=True)
+class Transaction:
+    op: Op
+    start: int
+    duration: int
+    pin: int = 0
+    value: int = 0
+    data: bytes = b""
+    delay: float = 0.0
+
+
+class Recorder:
+    # Swaps the traced functions on a backend (the epdconfig module, or anything with the same functions)
+    # for wrappers that log every call with its timing, and swaps them back on exit.
+
+    def __init__(self, backend: Any, output: BinaryIO) -> None:
+        self._backend = backend
+        self._output = output
+        self._originals: dict[str, Any] = {}
+        self._started = 0
+
+    def _write(self, op: Op, start: int, payload: bytes) -> None:
+        now = time.perf_counter_ns()
+        self._output.write(_RECORD.pack(op, start - self._started, now - start) + payload)
+
+    def _wrap(self, op: Op, func: Any) -> Any:
+        def traced(*args: Any) -> Any:
+            start = time.perf_counter_ns()
+            result = func(*args)
+            match op:
+                case Op.DIGITAL_WRITE:
+                    payload = _PIN.pack(args[0], int(bool(args[1])))
+                case Op.DIGITAL_READ:
+                    payload = _PIN.pack(args[0], int(bool(result)))
+                case Op.SPI_WRITEBYTE | Op.SPI_WRITEBYTE2:
+                    data = bytes(args[0])
+                    payload = _LENGTH.pack(len(data)) + data
+                case Op.DELAY_MS:
+                    payload = _DELAY.pack(args[0])
+            self._write(op, start, payload)
+            return result
+
+        return traced
+
+    def __enter__(self) -> "Recorder":
+        self._output.write(_HEADER.pack(MAGIC, VERSION, self._backend.BUSY_PIN, self._backend.DC_PIN))
+        self._started = time.perf_counter_ns()
+        for op, name in TRACED.items():
+            self._originals[name] = getattr(self._backend, name)
+            setattr(self._backend, name, self._wrap(op, self._originals[name]))
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        for name, func in self._originals.items():
+            setattr(self._backend, name, func)
+        self._originals.clear()
+        self._output.flush()
+
+
+@contextmanager
+def record(path: Path) -> Iterator[Recorder]:
+    # Imported lazily for the same reason as the driver: epdconfig probes the board on import.
+    from bedside import epdconfig
+
+    logger.info("Recording EPD bus trace to %s", path)
+    with path.open("wb") as output, Recorder(epdconfig, output) as recorder:
+        yield recorder
+
+
+def read(source: BinaryIO) -> tuple[Pins, Iterator[Transaction]]:
+    magic, version, busy, dc = _HEADER.unpack(source.read(_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} bus trace")
+
+    def transactions() -> Iterator[Transaction]:
+        while header := source.read(_RECORD.size):
+            op, start, duration = _RECORD.unpack(header)
+            match Op(op):
+                case Op.DIGITAL_WRITE | Op.DIGITAL_READ:
+                    pin, value = _PIN.unpack(source.read(_PIN.size))
+                    yield Transaction(Op(op), start, duration, pin=pin, value=value)
+                case Op.SPI_WRITEBYTE | Op.SPI_WRITEBYTE2:
+                    (length,) = _LENGTH.unpack(source.read(_LENGTH.size))
+                    yield Transaction(Op(op), start, duration, data=source.read(length))
+                case Op.DELAY_MS:
+                    (delay,) = _DELAY.unpack(source.read(_DELAY.size))
+                    yield Transaction(Op(op), start, duration, delay=delay)
+
+    return Pins(busy, dc), transactions()
+
+
+@dataclass
+class TraceStats:
+    transactions: int = 0
+    elapsed: float = 0.0
+    bus_time: float = 0.0
+    delay_time: float = 0.0
+    busy_time: float = 0.0
+    spi_bytes: int = 0
+    bulk_bytes: int = 0
+    gpio_writes: int = 0
+    gpio_reads: int = 0
+
+    def __str__(self) -> str:
+        return "\n".join([
+            f"transactions      {self.transactions}",
+            f"elapsed           {self.elapsed:.3f}s",
+            f"bus time          {self.bus_time:.3f}s",
+            f"delays            {self.delay_time:.3f}s",
+            f"busy-waits        {self.busy_time:.3f}s",
+            f"SPI bytes         {self.spi_bytes} ({self.bulk_bytes} in bulk writes)",
+            f"GPIO writes/reads {self.gpio_writes}/{self.gpio_reads}",
+        ])
+
+
+def analyse(pins: Pins, transactions: Iterator[Transaction]) -> TraceStats:
+    stats = TraceStats()
+    busy_since: int | None = None
+    for transaction in transactions:
+        stats.transactions += 1
+        stats.elapsed = (transaction.start + transaction.duration) / 1e9
+        seconds = transaction.duration / 1e9
+        match transaction.op:
+            case Op.DELAY_MS:
+                # Requested rather than measured, so an emulated run that does not sleep still reports it.
+                stats.delay_time += transaction.delay / 1000
+            case Op.SPI_WRITEBYTE | Op.SPI_WRITEBYTE2:
+                stats.bus_time += seconds
+                stats.spi_bytes += len(transaction.data)
+                if transaction.op == Op.SPI_WRITEBYTE2:
+                    stats.bulk_bytes += len(transaction.data)
+            case Op.DIGITAL_WRITE:
+                stats.bus_time += seconds
+                stats.gpio_writes += 1
+            case Op.DIGITAL_READ:
+                stats.bus_time += seconds
+                stats.gpio_reads += 1
+                # The panel holds BUSY low while it works; time from the first low read to the next high one.
+                if transaction.pin == pins.busy:
+                    if transaction.value == 0 and busy_since is None:
+                        busy_since = transaction.start
+                    elif transaction.value and busy_since is not None:
+                        stats.busy_time += (transaction.start + transaction.duration - busy_since) / 1e9
+                        busy_since = None
+    return stats
+
+
+def _wait_idle(backend: Any, pin: int) -> None:
+    # The recording saw BUSY go high once the panel finished; a live panel is polled until it has finished too.
+    deadline = time.monotonic() + BUSY_TIMEOUT
+    while not backend.digital_read(pin):
+        if time.monotonic() > deadline:
+            logger.warning("Panel still busy after %.0fs, carrying on", BUSY_TIMEOUT)
+            return
+        backend.delay_ms(BUSY_POLL_MS)
+
+
+def replay(pins: Pins, transactions: Iterator[Transaction], backend: Any) -> TraceStats:
+    # Re-issue the recorded transactions against another backend, recording afresh to time that backend.
+    recording = io.BytesIO()
+    # The driver's init opens the bus through module_init, which is not traced.
+    backend.module_init()
+    try:
+        with Recorder(backend, recording):
+            for transaction in transactions:
+                match transaction.op:
+                    case Op.DIGITAL_WRITE:
+                        backend.digital_write(transaction.pin, transaction.value)
+                    case Op.DIGITAL_READ if transaction.pin == pins.busy and transaction.value:
+                        _wait_idle(backend, transaction.pin)
+                    case Op.DIGITAL_READ:
+                        backend.digital_read(transaction.pin)
+                    case Op.SPI_WRITEBYTE:
+                        backend.spi_writebyte(list(transaction.data))
+                    case Op.SPI_WRITEBYTE2:
+                        backend.spi_writebyte2(bytearray(transaction.data))
+                    case Op.DELAY_MS:
+                        backend.delay_ms(transaction.delay)
+    finally:
+        backend.module_exit()
+    recording.seek(0)
+    return analyse(*read(recording))
+
+
+def spi_stream(pins: Pins, transactions: Iterator[Transaction]) -> Iterator[tuple[int, int]]:
+    # (DC level, byte) for everything sent over SPI, so command and data bytes compare separately.
+    dc = 0
+    for transaction in transactions:
+        if transaction.op == Op.DIGITAL_WRITE and transaction.pin == pins.dc:
+            dc = transaction.value
+        elif transaction.op in (Op.SPI_WRITEBYTE, Op.SPI_WRITEBYTE2):
+            for byte in transaction.data:
+                yield dc, byte
+
+
+def diff(a: tuple[Pins, Iterator[Transaction]], b: tuple[Pins, Iterator[Transaction]]) -> int | None:
+    # Index of the first SPI byte where two traces diverge, or None if both sent exactly the same bytes.
+    missing = (-1, -1)
+    stream_a, stream_b = spi_stream(*a), spi_stream(*b)
+    index = 0
+    while True:
+        byte_a, byte_b = next(stream_a, missing), next(stream_b, missing)
+        if byte_a != byte_b:
+            return index
+        if byte_a == missing:
+            return None
+        index += 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(prog="bedside.trace", description="Inspect and replay EPD bus traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats_parser = commands.add_parser("stats", help="Summarise a recorded trace")
+    stats_parser.add_argument("trace", type=Path)
+    replay_parser = commands.add_parser("replay", help="Re-run a trace against a backend and time it")
+    replay_parser.add_argument("trace", type=Path)
+    replay_parser.add_argument("--backend", choices=["emulator", "epdconfig"], default="emulator")
+    diff_parser = commands.add_parser("diff", help="Compare the SPI bytes of two traces")
+    diff_parser.add_argument("a", type=Path)
+    diff_parser.add_argument("b", type=Path)
+    args = parser.parse_args()
+
+    match args.command:
+        case "stats":
+            with args.trace.open("rb") as f:
+                print(analyse(*read(f)))
+        case "replay":
+            if args.backend == "epdconfig":
+                from bedside import epdconfig
+
+                backend = epdconfig
+            else:
+                from bedside.mock import MockBus
+
+                backend = MockBus()
+            with args.trace.open("rb") as f:
+                print(replay(*read(f), backend))
+        case "diff":
+            with args.a.open("rb") as a, args.b.open("rb") as b:
+                index = diff(read(a), read(b))
+            print("SPI streams are identical" if index is None else f"SPI streams diverge at byte {index}")
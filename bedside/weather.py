@@ -1,33 +1,40 @@
+import asyncio
 import datetime
+import logging
+import os
 from enum import StrEnum
-from importlib import resources
 
 import aiohttp
-from PIL import Image
 from suntime import Sun
 from tzfpy import get_tz
 from yarl import URL
 
-import bedside
-from bedside.widget import Widget, blank
+from bedside.executor import offload
+from bedside.state import load_json, save_json
+from bedside.widget import Widget, load_sprite
+
+logger = logging.getLogger(__name__)
 
 _WEATHER_WIDGET = "weather"
+_WEATHER_CACHE = "weather.json"
+# Overrides the Open-Meteo forecast endpoint, e.g. to point at a stub server.
+WEATHER_URL_ENV = "BEDSIDE_WEATHER_URL"
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+# Seconds to hold the first request for a location while others join the same upstream call.
+BATCH_WINDOW = 0.5
+
+Location = tuple[float, float]
 
 
-def _weather_url(latitude: float, longitude: float) -> URL:
-    timezone = get_tz(longitude, latitude)
-    return URL.build(
-        scheme="https",
-        host="api.open-meteo.com",
-        path="/v1/forecast",
-        query={
-            "latitude": str(latitude),
-            "longitude": str(longitude),
-            "timezone": timezone,
-            "daily": "weather_code",
-            "forecast_days": "1",
-        },
-    )
+def _weather_url(locations: list[Location]) -> URL:
+    # Open-Meteo takes comma-separated coordinates (and timezones) and answers with one forecast per location.
+    return URL(os.environ.get(WEATHER_URL_ENV, WEATHER_URL)).with_query({
+        "latitude": ",".join(str(latitude) for latitude, _ in locations),
+        "longitude": ",".join(str(longitude) for _, longitude in locations),
+        "timezone": ",".join(get_tz(longitude, latitude) for latitude, longitude in locations),
+        "daily": "weather_code",
+        "forecast_days": "1",
+    })
 
 
 class Weather(StrEnum):
@@ -50,26 +57,100 @@ class Weather(StrEnum):
         return Weather.SUNNY
 
 
-async def get_weather_code(latitude: float, longitude: float) -> Weather:
+async def fetch_weather_codes(locations: list[Location]) -> list[Weather]:
     async with aiohttp.ClientSession() as session:
-        async with session.get(_weather_url(latitude, longitude)) as response:
+        async with session.get(_weather_url(locations)) as response:
+            response.raise_for_status()
             weather_payload = await response.json()
-    return Weather.from_wmo(weather_payload["daily"]["weather_code"][0])
+    # A single location comes back as an object rather than a list of one.
+    forecasts = weather_payload if isinstance(weather_payload, list) else [weather_payload]
+    if len(forecasts) != len(locations):
+        raise ValueError(f"Asked for weather at {len(locations)} locations, got {len(forecasts)}")
+    return [Weather.from_wmo(forecast["daily"]["weather_code"][0]) for forecast in forecasts]
+
+
+class WeatherBatcher:
+    # Requests arriving within the batch window share one upstream call; a location already being
+    # fetched is not asked for again, its callers wait on the same result.
+
+    def __init__(self, window: float = BATCH_WINDOW) -> None:
+        self._window = window
+        self._results: dict[Location, asyncio.Future[Weather]] = {}
+        self._batch: list[Location] = []
+        self._fetches: set[asyncio.Task[None]] = set()
+
+    async def get(self, latitude: float, longitude: float) -> Weather:
+        location = (latitude, longitude)
+        result = self._results.get(location)
+        if result is None:
+            loop = asyncio.get_running_loop()
+            result = self._results[location] = loop.create_future()
+            if not self._batch:
+                loop.call_later(self._window, self._flush)
+            self._batch.append(location)
+        else:
+            logger.debug("Joining in-flight weather request for %s", location)
+        # Shielded so one caller giving up does not cancel the answer for the others.
+        return await asyncio.shield(result)
+
+    def _flush(self) -> None:
+        batch, self._batch = self._batch, []
+        fetch = asyncio.create_task(self._fetch(batch))
+        self._fetches.add(fetch)
+        fetch.add_done_callback(self._fetches.discard)
+
+    async def _fetch(self, batch: list[Location]) -> None:
+        logger.info("Fetching weather for %d locations in one request", len(batch))
+        try:
+            codes = await fetch_weather_codes(batch)
+        except Exception as e:
+            for location in batch:
+                self._results.pop(location).set_exception(e)
+            return
+        for location, code in zip(batch, codes, strict=True):
+            self._results.pop(location).set_result(code)
+
+
+_batcher = WeatherBatcher()
+
+
+async def get_weather_code(latitude: float, longitude: float) -> Weather:
+    return await _batcher.get(latitude, longitude)
+
+
+def _cache_key(latitude: float, longitude: float) -> str:
+    return f"{latitude},{longitude}"
+
+
+async def _weather_widget(weather_code: Weather) -> Widget:
+    if weather_code == Weather.SUNNY:
+        return Widget(name=_WEATHER_WIDGET, z=-99)
+    return await offload(_weather_img, str(weather_code))
 
 
 async def get_weather(latitude: float, longitude: float) -> Widget:
     weather_code = await get_weather_code(latitude, longitude)
-    if weather_code == Weather.SUNNY:
-        return Widget(name=_WEATHER_WIDGET, z=-99, bw=blank())
-    with resources.open_binary(bedside, "assets", "weather", f"{weather_code}.bmp") as f:
-        weather = Image.open(f).convert(mode="RGBA")
-        return Widget(name=_WEATHER_WIDGET, z=-99, bw=weather)
+    cache = load_json(_WEATHER_CACHE) or {}
+    cache[_cache_key(latitude, longitude)] = {"code": weather_code, "fetched": datetime.datetime.now().isoformat()}
+    save_json(_WEATHER_CACHE, cache)
+    return await _weather_widget(weather_code)
+
+
+async def get_cached_weather(latitude: float, longitude: float) -> Widget | None:
+    # The last weather fetched for this location, for drawing before the network has answered.
+    cached = (load_json(_WEATHER_CACHE) or {}).get(_cache_key(latitude, longitude))
+    if cached is None:
+        return None
+    logger.info("Using weather '%s' cached at %s", cached["code"], cached["fetched"])
+    return await _weather_widget(Weather(cached["code"]))
+
+
+def _weather_img(name: str) -> Widget:
+    return Widget(name=_WEATHER_WIDGET, z=-99, bw=load_sprite("weather", f"{name}.bmp"))
 
 
-def get_night() -> Widget:
-    with resources.open_binary(bedside, "assets", "weather", "night.bmp") as f:
-        night = Image.open(f).convert(mode="RGBA")
-        return Widget(name=_WEATHER_WIDGET, z=-99, bw=night)
+async def get_night() -> Widget:
+    return await offload(_weather_img, "night")
 
 
 def get_next_sunrise(latitude: float, longitude: float) -> datetime.datetime:
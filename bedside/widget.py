@@ -1,18 +1,86 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from importlib import resources
 
 from PIL import Image
 
+import bedside
+from bedside.dither import Dither, dither, get_default
+
 WIDTH = 800
 HEIGHT = 480
 
+Box = tuple[int, int, int, int]
+
+
+def union(a: Box | None, b: Box | None) -> Box | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+# Alpha at or above this is treated as covering whatever lies beneath the sprite.
+OPAQUE = 128
+
+
+@dataclass(frozen=True)
+class Sprite:
+    # Both planes are mode "1": ink holds the colour (0 = ink, 255 = paper), mask where the sprite is opaque.
+    ink: Image.Image
+    mask: Image.Image
+    x: int = 0
+    y: int = 0
 
-def blank() -> Image.Image:
-    return Image.new("RGBA", (WIDTH, HEIGHT), (255, 255, 255, 0))
+    @property
+    def bbox(self) -> Box:
+        return self.x, self.y, self.x + self.ink.width, self.y + self.ink.height
+
+    @classmethod
+    def from_image(cls, image: Image.Image, method: Dither | None = None) -> "Sprite | None":
+        image = image.convert("RGBA")
+        if image.size == (HEIGHT, WIDTH):
+            # Portrait assets get the same treatment EPD.getbuffer gives portrait frames.
+            image = image.rotate(90, expand=True)
+        mask = image.getchannel("A").point(lambda alpha: 255 if alpha >= OPAQUE else 0, mode="1")
+        bbox = mask.getbbox()
+        if bbox is None:
+            return None
+        ink = dither(image.crop(bbox), method, origin=bbox[:2])
+        return cls(ink=ink, mask=mask.crop(bbox), x=bbox[0], y=bbox[1])
+
+    @classmethod
+    def from_planes(
+        cls, ink: bytes | memoryview, mask: bytes | memoryview, size: tuple[int, int], x: int = 0, y: int = 0
+    ) -> "Sprite":
+        # Copied out of the packed planes: PIL stores mode "1" at a byte per pixel.
+        return cls(
+            ink=Image.frombuffer("1", size, ink, "raw", "1", 0, 1),
+            mask=Image.frombuffer("1", size, mask, "raw", "1", 0, 1),
+            x=x,
+            y=y,
+        )
+
+
+def load_sprite(*path: str) -> Sprite | None:
+    # Imported here as the atlas itself is built from Sprites.
+    from bedside.atlas import default_atlas
+
+    atlas = default_atlas()
+    key = "/".join(path)
+    if atlas is not None and atlas.dither == get_default() and key in atlas:
+        return atlas.sprite(key)
+    with resources.files(bedside).joinpath("assets", *path).open("rb") as f:
+        return Sprite.from_image(Image.open(f))
 
 
 @dataclass
 class Widget:
     name: str
     z: int
-    bw: Image.Image = field(default_factory=blank)
-    red: Image.Image = field(default_factory=blank)
+    bw: Sprite | None = None
+    red: Sprite | None = None
+
+    @property
+    def bbox(self) -> Box | None:
+        return union(self.bw and self.bw.bbox, self.red and self.red.bbox)
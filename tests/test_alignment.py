@@ -0,0 +1,70 @@
+import datetime
+
+from bedside.alignment import RefreshWindows
+
+DAY = datetime.date(2026, 1, 15)
+NOW = datetime.datetime.combine(DAY, datetime.time(hour=12))
+TOLERANCE = datetime.timedelta(minutes=30)
+
+
+def at(hour: int, minute: int = 0, day: datetime.date = DAY) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time(hour=hour, minute=minute))
+
+
+def test_snaps_onto_daily_window() -> None:
+    windows = RefreshWindows()
+    windows.add_daily(datetime.time(hour=21))
+    assert windows.align(at(20, 45), TOLERANCE, now=NOW) == at(21)
+    assert windows.snapped(DAY) == 1
+
+
+def test_keeps_time_outside_tolerance() -> None:
+    windows = RefreshWindows()
+    windows.add_daily(datetime.time(hour=21))
+    assert windows.align(at(20, 15), TOLERANCE, now=NOW) == at(20, 15)
+    assert windows.snapped(DAY) == 0
+
+
+def test_daily_window_across_midnight() -> None:
+    windows = RefreshWindows()
+    windows.add_daily(datetime.time(hour=0))
+    tomorrow = DAY + datetime.timedelta(days=1)
+    assert windows.align(at(23, 50), TOLERANCE, now=NOW) == at(0, day=tomorrow)
+    assert windows.snapped(tomorrow) == 1
+
+
+def test_never_snaps_into_the_past() -> None:
+    windows = RefreshWindows()
+    windows.add_daily(datetime.time(hour=12))
+    assert windows.align(at(12, 10), TOLERANCE, now=at(12, 5)) == at(12, 10)
+
+
+def test_one_offs_share_a_window() -> None:
+    windows = RefreshWindows()
+    first = windows.align(at(15), TOLERANCE, now=NOW)
+    assert first == at(15)
+    # A later job close to the first rides on its refresh, and so does a third near it.
+    assert windows.align(at(15, 20), TOLERANCE, now=NOW) == at(15)
+    assert windows.align(at(14, 40), TOLERANCE, now=NOW) == at(15)
+    assert windows.snapped(DAY) == 2
+
+
+def test_nearest_window_wins() -> None:
+    windows = RefreshWindows()
+    windows.add_daily(datetime.time(hour=18))
+    windows.add_daily(datetime.time(hour=18, minute=40))
+    assert windows.align(at(18, 25), TOLERANCE, now=NOW) == at(18, 40)
+
+
+def test_passed_one_offs_are_forgotten() -> None:
+    windows = RefreshWindows()
+    windows.align(at(15), TOLERANCE, now=NOW)
+    assert windows.align(at(15, 20), TOLERANCE, now=at(15, 1)) == at(15, 20)
+
+
+def test_report_resets_the_day() -> None:
+    windows = RefreshWindows()
+    windows.add_daily(datetime.time(hour=21))
+    windows.align(at(20, 45), TOLERANCE, now=NOW)
+    assert windows.report(DAY) == 1
+    assert windows.snapped(DAY) == 0
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import pytest
+from PIL import Image
+
+from bedside import atlas
+from bedside.dither import Dither
+from bedside.widget import Sprite
+
+
+@pytest.fixture
+def assets(tmp_path):
+    copied = tmp_path / "assets"
+    shutil.copytree(atlas.ASSETS, copied, ignore=shutil.ignore_patterns("atlas.bin", "*.xcf", "*.png"))
+    return copied
+
+
+@pytest.mark.parametrize("method", list(Dither))
+def test_atlas_sprites_match_decoded(assets, tmp_path, method: Dither) -> None:
+    path = tmp_path / "atlas.bin"
+    count = atlas.build(assets, path, method)
+    packed = atlas.Atlas(path)
+    assert packed.dither == method
+    sources = sorted(assets.rglob("*.bmp"))
+    assert count == len(sources)
+    for source in sources:
+        with Image.open(source) as image:
+            expected = Sprite.from_image(image, method)
+        sprite = packed.sprite(source.relative_to(assets).as_posix())
+        assert sprite.bbox == expected.bbox
+        assert sprite.ink.tobytes() == expected.ink.tobytes()
+        assert sprite.mask.tobytes() == expected.mask.tobytes()
+
+
+def test_not_an_atlas(tmp_path) -> None:
+    path = tmp_path / "atlas.bin"
+    path.write_bytes(b"BMP?" + bytes(16))
+    with pytest.raises(ValueError, match="not a version"):
+        atlas.Atlas(path)
+
+
+def test_stale_atlas_is_ignored(monkeypatch, assets, tmp_path) -> None:
+    path = tmp_path / "atlas.bin"
+    atlas.build(assets, path, Dither.THRESHOLD)
+    monkeypatch.setattr(atlas, "ASSETS", assets)
+    monkeypatch.setattr(atlas, "ATLAS_PATH", path)
+    atlas.default_atlas.cache_clear()
+    try:
+        assert atlas.default_atlas() is not None
+
+        built = path.stat().st_mtime
+        os.utime(assets / "background.bmp", (built + 10, built + 10))
+        atlas.default_atlas.cache_clear()
+        assert atlas.default_atlas() is None
+
+        path.unlink()
+        atlas.default_atlas.cache_clear()
+        assert atlas.default_atlas() is None
+    finally:
+        atlas.default_atlas.cache_clear()
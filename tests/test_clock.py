@@ -0,0 +1,54 @@
+import datetime
+from importlib import resources
+
+import numpy as np
+import pytest
+
+import bedside
+from bedside.clock import CLOCK_HEIGHT, CLOCK_WIDTH, CLOCK_X, CLOCK_Y, get_clock
+from bedside.widget import load_sprite
+
+CLOCK_BOX = (CLOCK_X, CLOCK_Y, CLOCK_X + CLOCK_WIDTH, CLOCK_Y + CLOCK_HEIGHT)
+
+
+def assets() -> list[tuple[str, ...]]:
+    root = resources.files(bedside).joinpath("assets")
+    return [(folder.name, sprite.name) for folder in root.iterdir() if folder.is_dir() for sprite in folder.iterdir()]
+
+
+def overlaps(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def test_clock_is_byte_aligned() -> None:
+    assert CLOCK_X % 8 == 0
+    assert CLOCK_WIDTH % 8 == 0
+
+
+@pytest.mark.parametrize("path", assets(), ids="/".join)
+def test_clock_does_not_cover_sprites(path: tuple[str, ...]) -> None:
+    sprite = load_sprite(*path)
+    assert sprite is None or not overlaps(sprite.bbox, CLOCK_BOX)
+
+
+def test_clock_sits_on_empty_wall() -> None:
+    background = load_sprite("background.bmp")
+    x0, y0, x1, y1 = CLOCK_BOX
+    # Mode "1" ink is 0 where there is ink.
+    assert np.asarray(background.ink)[y0:y1, x0:x1].all()
+
+
+def test_clock_shows_the_time() -> None:
+    morning = get_clock(datetime.datetime(2026, 10, 19, 7, 5))
+    evening = get_clock(datetime.datetime(2026, 10, 19, 19, 45))
+    assert morning.bbox == evening.bbox == CLOCK_BOX
+    assert not np.asarray(morning.bw.ink).all()
+    assert morning.bw.ink.tobytes() != evening.bw.ink.tobytes()
+    # Opaque over its whole patch, so the previous minute is painted out.
+    assert np.asarray(morning.bw.mask).all()
+
+
+def test_every_date_renders() -> None:
+    day = datetime.datetime(2026, 1, 1, 23, 59)
+    for offset in range(0, 366, 7):
+        get_clock(day + datetime.timedelta(days=offset))
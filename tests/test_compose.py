@@ -0,0 +1,52 @@
+import itertools
+from importlib import resources
+
+import pytest
+from PIL import Image
+
+import bedside
+from bedside.frame import render_frame
+from bedside.widget import HEIGHT, WIDTH, Widget, load_sprite
+
+MEWO = [None, "desk", "floor", "sleep"]
+BERT = ["bloom", "leafless"]
+# None is the sunny forecast, which draws nothing.
+WEATHER = [None, "cloudy", "overcast", "rain", "night"]
+
+
+def rgba(*path: str) -> Image.Image:
+    with resources.files(bedside).joinpath("assets", *path).open("rb") as f:
+        image = Image.open(f).convert("RGBA")
+    # rain.bmp is stored portrait; alpha_composite only cropped it, sprites turn it as getbuffer turns portrait frames.
+    return image.rotate(90, expand=True) if image.size == (HEIGHT, WIDTH) else image
+
+
+def getbuffer(image: Image.Image) -> bytes:
+    # EPD.getbuffer, without importing the driver and with it the board.
+    return bytes(byte ^ 0xFF for byte in image.convert("1").tobytes("raw"))
+
+
+def rgba_planes(layers: list[Image.Image]) -> tuple[bytes, bytes]:
+    # How frames were composed before sprites: full-size RGBA layers, blended, then thresholded once.
+    bw = Image.new("RGBA", (WIDTH, HEIGHT), (255, 255, 255, 0))
+    red = Image.new("RGBA", (WIDTH, HEIGHT), (255, 255, 255, 0))
+    for layer in layers:
+        bw.alpha_composite(layer)
+    return getbuffer(bw), getbuffer(red)
+
+
+@pytest.mark.parametrize(("mewo", "bert", "weather"), list(itertools.product(MEWO, BERT, WEATHER)))
+def test_matches_rgba_composition(mewo: str | None, bert: str, weather: str | None) -> None:
+    assets = [("background.bmp",), ("bert", f"{bert}.bmp")]
+    if mewo:
+        assets.append(("mewo", f"{mewo}.bmp"))
+    if weather:
+        assets.append(("weather", f"{weather}.bmp"))
+
+    expected = rgba_planes([rgba(*path) for path in assets])
+    widgets = [
+        Widget(name="/".join(path), z=-100 if index == 0 else -99, bw=load_sprite(*path))
+        for index, path in enumerate(assets)
+    ]
+    frame = render_frame(widgets)
+    assert (frame.black, frame.red) == expected
@@ -0,0 +1,246 @@
+import asyncio
+import datetime
+import importlib
+import sys
+
+import pytest
+
+import bedside
+from bedside.clock import CLOCK_HEIGHT, CLOCK_WIDTH, CLOCK_X, CLOCK_Y, get_clock
+from bedside.device import DeviceSession, PanelState, load_shown
+from bedside.frame import Frame, render_frame, window
+from bedside.mewo import MewoState, _mewo_img
+from bedside.mock import MockBus
+from bedside.widget import HEIGHT as EPD_HEIGHT
+from bedside.widget import WIDTH as EPD_WIDTH
+from bedside.widget import Widget, load_sprite
+
+WIDTH, HEIGHT = 64, 32
+PLANE = WIDTH * HEIGHT // 8
+
+
+class FakeEPD:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        # The arguments of the latest call to each method.
+        self.args: dict[str, tuple] = {}
+
+    def __getattr__(self, name: str):
+        def call(*args) -> None:
+            self.calls.append(name)
+            self.args[name] = args
+
+        return call
+
+
+def frame(black: bytes = bytes(PLANE), red: bytes = bytes(PLANE)) -> Frame:
+    return Frame(black=black, red=red, width=WIDTH, height=HEIGHT)
+
+
+@pytest.fixture
+def session() -> DeviceSession:
+    return DeviceSession(FakeEPD())
+
+
+def test_frame_arriving_while_awake_skips_sleep_and_init(session: DeviceSession) -> None:
+    async def run() -> None:
+        session.display(frame())
+        session.sleep_after(0.05)
+        session.cancel_sleep()
+        session.display(frame(red=b"\x01" + bytes(PLANE - 1)))
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert session.epd.calls == ["init", "display", "display"]
+    assert session.state == PanelState.FULL
+
+
+def test_idle_panel_sleeps_then_reinits(session: DeviceSession) -> None:
+    async def run() -> None:
+        session.display(frame())
+        session.sleep_after(0.01)
+        await asyncio.sleep(0.2)
+        assert session.state == PanelState.SLEEPING
+        saved = session.saved
+        # The sleep happened, so nothing is saved by cancelling afterwards.
+        session.cancel_sleep()
+        assert session.saved == saved
+        session.display(frame(red=b"\x01" + bytes(PLANE - 1)))
+
+    asyncio.run(run())
+    assert session.epd.calls == ["init", "display", "sleep", "init", "display"]
+
+
+def test_sleep_under_way_is_not_counted_as_skipped(session: DeviceSession) -> None:
+    async def run() -> None:
+        session.display(frame())
+        session.sleep_after(0)
+        # Let the timer fire: the sleep has started on its thread before the next frame cancels.
+        await asyncio.sleep(0.01)
+        saved = session.saved
+        session.cancel_sleep()
+        assert session.saved == saved
+        await session._sleeping
+
+    asyncio.run(run())
+    assert session.epd.calls == ["init", "display", "sleep"]
+
+
+def test_identical_frame_is_not_redrawn(session: DeviceSession) -> None:
+    session.display(frame())
+    session.display(frame())
+    assert session.epd.calls == ["init", "display"]
+
+
+def inked(box: tuple[int, int, int, int], plane: bytes = bytes(PLANE)) -> bytes:
+    # A plane with every pixel of the byte-aligned box inked.
+    x0, y0, x1, y1 = box
+    rows = bytearray(plane)
+    for y in range(y0, y1):
+        rows[y * WIDTH // 8 + x0 // 8 : y * WIDTH // 8 + x1 // 8] = b"\xff" * ((x1 - x0) // 8)
+    return bytes(rows)
+
+
+SMALL = (8, 8, 16, 16)
+
+
+def test_first_frame_is_full(session: DeviceSession) -> None:
+    session.display(frame(black=inked(SMALL)))
+    assert session.state == PanelState.FULL
+
+
+def test_small_black_change_is_partial(session: DeviceSession) -> None:
+    session.display(frame())
+    session.display(frame(black=inked(SMALL)))
+    assert session.state == PanelState.PARTIAL
+    assert session.epd.calls[-2:] == ["init_part", "display_Partial_frame"]
+    # The driver gets the whole plane, not a copy of the window, and cuts the rows out itself.
+    plane, *box = session.epd.args["display_Partial_frame"]
+    assert isinstance(plane, memoryview)
+    assert plane == inked(SMALL)
+    assert tuple(box) == SMALL
+
+
+def test_large_change_is_full(session: DeviceSession) -> None:
+    session.display(frame())
+    session.display(frame(black=inked((0, 0, 64, 8))))
+    assert session.state == PanelState.FULL
+    assert session.epd.calls == ["init", "display", "display"]
+
+
+def test_red_change_forces_full(session: DeviceSession) -> None:
+    session.display(frame())
+    session.display(frame(black=inked(SMALL), red=inked((48, 24, 56, 32))))
+    assert session.state == PanelState.FULL
+
+
+def test_red_ink_in_window_forces_full(session: DeviceSession) -> None:
+    # Partial mode only drives black, which would wipe the red already inside the window.
+    session.display(frame(red=inked(SMALL)))
+    session.display(frame(black=inked(SMALL), red=inked(SMALL)))
+    assert session.state == PanelState.FULL
+
+
+def test_resume_pushes_any_black_change_partially() -> None:
+    session = DeviceSession(FakeEPD(), shown=frame())
+    session.display(frame(black=inked((0, 0, 64, 8))))
+    assert session.state == PanelState.PARTIAL
+
+
+def test_partials_are_cleared_by_a_full_refresh(monkeypatch, session: DeviceSession) -> None:
+    monkeypatch.setattr("bedside.device.PARTIAL_LIMIT", 3)
+    session.display(frame())
+    for index in range(4):
+        session.display(frame(black=inked(SMALL, bytes([index]) + bytes(PLANE - 1))))
+    assert session.epd.calls.count("display_Partial_frame") == 3
+    assert session.state == PanelState.FULL
+
+
+def test_saves_windows_after_partials(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("BEDSIDE_STATE_DIR", str(tmp_path))
+    session = DeviceSession(FakeEPD())
+    session.display(frame())
+    session.save()
+    assert load_shown() == frame()
+
+    latest = frame(black=inked((16, 16, 24, 24), inked(SMALL)))
+    session.display(frame(black=inked(SMALL)))
+    session.save()
+    session.display(latest)
+    session.save()
+    # The whole frame is written once; the partials only rewrite their window.
+    assert (tmp_path / "shown-window.json").stat().st_size < PLANE
+    restored = load_shown()
+    assert restored == latest
+    assert restored.etag == latest.etag
+
+    # A full refresh supersedes the saved window.
+    session.display(frame(red=inked(SMALL)))
+    session.save()
+    assert load_shown() == frame(red=inked(SMALL))
+
+
+def test_resumed_session_saves_the_whole_frame(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("BEDSIDE_STATE_DIR", str(tmp_path))
+    session = DeviceSession(FakeEPD())
+    session.display(frame())
+    session.save()
+    session.display(frame(black=inked(SMALL)))
+    session.save()
+
+    resumed = DeviceSession(FakeEPD(), shown=load_shown())
+    latest = frame(black=inked((16, 16, 24, 24)))
+    resumed.display(latest)
+    resumed.save()
+    assert load_shown() == latest
+
+
+def test_clock_tick_is_a_partial_refresh() -> None:
+    background = Widget(name="background", z=-100, bw=load_sprite("background.bmp"))
+    mewo = _mewo_img(MewoState.floor, -99)
+    session = DeviceSession(FakeEPD())
+    for minute in (5, 6):
+        session.display(render_frame([background, mewo, get_clock(datetime.datetime(2026, 10, 19, 7, minute))]))
+    assert session.state == PanelState.PARTIAL
+    assert session.epd.calls == ["init", "display", "init_part", "display_Partial_frame"]
+    x0, y0, x1, y1 = session.epd.args["display_Partial_frame"][1:]
+    assert CLOCK_X <= x0 < x1 <= CLOCK_X + CLOCK_WIDTH
+    assert CLOCK_Y <= y0 < y1 <= CLOCK_Y + CLOCK_HEIGHT
+
+
+class SpyBus(MockBus):
+    # Keeps what each bulk transfer was handed, so copies can be told from views.
+    def __init__(self) -> None:
+        super().__init__()
+        self.transfers: list = []
+
+    def spi_writebyte2(self, data):
+        self.transfers.append(data)
+        super().spi_writebyte2(data)
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    bus = SpyBus()
+    monkeypatch.setitem(sys.modules, "bedside.epdconfig", bus)
+    monkeypatch.delattr(bedside, "epdconfig", raising=False)
+    monkeypatch.delitem(sys.modules, "bedside.epd7in5b_V2", raising=False)
+    yield bus
+    # The driver was imported against the bus; the next user imports it afresh.
+    sys.modules.pop("bedside.epd7in5b_V2", None)
+    vars(bedside).pop("epd7in5b_V2", None)
+
+
+@pytest.mark.parametrize("box", [(0, 40, EPD_WIDTH, 104), (128, 40, 256, 104)])
+def test_partial_frame_sends_the_window_rows(bus: SpyBus, box) -> None:
+    epd = importlib.import_module("bedside.epd7in5b_V2").EPD()
+    plane = bytes(i % 251 for i in range(EPD_WIDTH * EPD_HEIGHT // 8))
+    epd.display_Partial(window(plane, box), *box)
+    expected = bytes(bus.data[0x13])
+    bus.transfers.clear()
+    epd.display_Partial_frame(memoryview(plane), *box)
+    assert bus.data[0x13] == expected == window(plane, box)
+    # One bulk transfer for the rows, however narrow the window.
+    (rows,) = bus.transfers
+    # A full-width window is a view of the plane itself.
+    assert isinstance(rows, memoryview) == (box[2] - box[0] == EPD_WIDTH)
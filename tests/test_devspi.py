@@ -0,0 +1,188 @@
+import ctypes
+import importlib
+import shutil
+import struct
+import subprocess
+import sys
+
+import pytest
+
+import bedside
+from bedside import devspi
+from bedside.mock import MockDevConfig
+
+PLANE = 800 * 480 // 8
+
+# Enough of DEV_Config to load through ctypes, recording what the Python side sends it.
+STUB_SOURCE = """
+#include <stdint.h>
+
+uint32_t inits, sent, checksum;
+const uint8_t *last_buffer;
+
+int DEV_Module_Init(void) { inits++; return 0; }
+void DEV_Module_Exit(void) {}
+void DEV_SPI_SendData(uint8_t value) { sent++; checksum += value; }
+void DEV_SPI_SendnData(uint8_t *data, uint32_t length) {
+    last_buffer = data;
+    for (uint32_t i = 0; i < length; i++) checksum += data[i];
+    sent += length;
+}
+uint8_t DEV_SPI_ReadData(void) { return 0xA5; }
+void stub_reset(void) { inits = sent = checksum = 0; last_buffer = 0; }
+"""
+
+
+@pytest.fixture
+def library(monkeypatch, tmp_path):
+    # A DEV_Config library on the search path that opens as the stub, counting how often it is opened.
+    path = tmp_path / ("DEV_Config_64.so" if struct.calcsize("P") == 8 else "DEV_Config_32.so")
+    path.touch()
+    opened: list[str] = []
+
+    def cdll(name: str) -> MockDevConfig:
+        opened.append(name)
+        return MockDevConfig()
+
+    monkeypatch.setattr(devspi, "_SEARCH_DIRS", [str(tmp_path)])
+    monkeypatch.setattr(devspi.ctypes, "CDLL", cdll)
+    devspi.find_library.cache_clear()
+    devspi.load.cache_clear()
+    yield path, opened
+    devspi.find_library.cache_clear()
+    devspi.load.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def compiled_stub(tmp_path_factory):
+    compiler = shutil.which("cc")
+    if compiler is None:
+        pytest.skip("no C compiler to build the DEV_Config stub")
+    directory = tmp_path_factory.mktemp("devconfig")
+    source = directory / "DEV_Config.c"
+    source.write_text(STUB_SOURCE)
+    bits = struct.calcsize("P") * 8
+    subprocess.run([compiler, "-shared", "-fPIC", "-o", directory / f"DEV_Config_{bits}.so", source], check=True)  # noqa: S603
+    # The other word size's library is there too, and is not even a library: picking it fails to load.
+    (directory / f"DEV_Config_{96 - bits}.so").write_bytes(b"not an ELF file")
+    return directory
+
+
+@pytest.fixture
+def native(monkeypatch, compiled_stub):
+    monkeypatch.setattr(devspi, "_SEARCH_DIRS", ["/nonexistent", str(compiled_stub)])
+    devspi.find_library.cache_clear()
+    devspi.load.cache_clear()
+    lib = devspi.load()
+    lib.stub_reset()
+    yield lib
+    devspi.find_library.cache_clear()
+    devspi.load.cache_clear()
+
+
+def stub_counter(lib: ctypes.CDLL, name: str) -> int:
+    return ctypes.c_uint32.in_dll(lib, name).value
+
+
+class RaspberryPiCpuinfo:
+    # What epdconfig's board probe reads from /proc/cpuinfo on a Pi.
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def communicate(self) -> tuple[str, None]:
+        return "Model\t\t: Raspberry Pi Zero 2 W Rev 1.0\n", None
+
+
+@pytest.fixture
+def epdconfig(monkeypatch, library):
+    pytest.importorskip("spidev")
+    gpiozero = pytest.importorskip("gpiozero")
+    monkeypatch.setenv("GPIOZERO_PIN_FACTORY", "mock")
+    monkeypatch.setenv(devspi.BACKEND_ENV, devspi.DEVCONFIG)
+    monkeypatch.setattr(subprocess, "Popen", RaspberryPiCpuinfo)
+    sys.modules.pop("bedside.epdconfig", None)
+    try:
+        yield importlib.import_module("bedside.epdconfig")
+    finally:
+        # Importing also set the package attribute, which `from bedside import epdconfig` would pick up later.
+        sys.modules.pop("bedside.epdconfig", None)
+        vars(bedside).pop("epdconfig", None)
+        gpiozero.Device.pin_factory.reset()
+
+
+def test_nwrite_counts_bytes() -> None:
+    lib = MockDevConfig()
+    devspi.nwrite(lib, bytearray(PLANE))
+    devspi.nwrite(lib, bytes(16))
+    devspi.nwrite(lib, [1, 2, 3])
+    assert lib.sent == PLANE + 16 + 3
+
+
+def test_library_is_found_and_loaded_once(library) -> None:
+    path, opened = library
+    lib = devspi.load()
+    assert devspi.load() is lib
+    assert opened == [str(path)]
+    path.unlink()
+    assert devspi.find_library() == str(path)
+
+
+def test_missing_library(monkeypatch, library) -> None:
+    path, _ = library
+    path.unlink()
+    devspi.find_library.cache_clear()
+    with pytest.raises(RuntimeError):
+        devspi.load()
+
+
+def test_raspberry_pi_sends_planes_through_devconfig(epdconfig, library) -> None:
+    _, opened = library
+    pi = epdconfig.implementation
+    assert isinstance(pi, epdconfig.RaspberryPi)
+    # module_init runs on every wake from sleep; the library is opened and initialised once.
+    pi.module_init()
+    pi.module_init()
+    epdconfig.spi_writebyte([0x10])
+    epdconfig.spi_writebyte2(bytearray(PLANE))
+    epdconfig.spi_writebyte2(bytes(PLANE))
+    assert pi.DEV_SPI.sent == 1 + 2 * PLANE
+    assert len(opened) == 1
+
+
+def test_library_matches_the_interpreter(native, compiled_stub) -> None:
+    bits = struct.calcsize("P") * 8
+    assert devspi.find_library() == str(compiled_stub / f"DEV_Config_{bits}.so")
+    assert native.DEV_Module_Init() == 0
+    assert stub_counter(native, "inits") == 1
+
+
+def test_other_word_size_picks_the_other_library(monkeypatch, native, compiled_stub) -> None:
+    bits = struct.calcsize("P") * 8
+    monkeypatch.setattr(devspi.struct, "calcsize", lambda _: (96 - bits) // 8)
+    devspi.find_library.cache_clear()
+    assert devspi.find_library() == str(compiled_stub / f"DEV_Config_{96 - bits}.so")
+
+
+def test_native_calls_follow_the_declared_types(native) -> None:
+    native.DEV_SPI_SendData(0x12)
+    assert native.DEV_SPI_ReadData() == 0xA5
+    # Only a ubyte pointer is accepted, so nothing but nwrite's buffers reaches the library.
+    with pytest.raises(ctypes.ArgumentError):
+        native.DEV_SPI_SendnData(b"\x01\x02", 2)
+    assert (stub_counter(native, "sent"), stub_counter(native, "checksum")) == (1, 0x12)
+
+
+def test_nwrite_passes_a_bytearray_in_place(native) -> None:
+    plane = bytearray(range(256)) * 8
+    devspi.nwrite(native, plane)
+    address = ctypes.addressof((ctypes.c_ubyte * len(plane)).from_buffer(plane))
+    assert ctypes.c_void_p.in_dll(native, "last_buffer").value == address
+    assert stub_counter(native, "sent") == len(plane)
+    assert stub_counter(native, "checksum") == sum(plane)
+
+
+@pytest.mark.parametrize("data", [bytes(range(200)), list(range(200))], ids=["bytes", "list"])
+def test_nwrite_copies_other_buffers(native, data) -> None:
+    devspi.nwrite(native, data)
+    assert stub_counter(native, "sent") == 200
+    assert stub_counter(native, "checksum") == sum(range(200))
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from bedside.dither import Dither, dither
+
+
+def gradient(width: int = 96, height: int = 64) -> Image.Image:
+    # Every grey level, varying along both axes so no row or column repeats another.
+    x, y = np.meshgrid(np.arange(width), np.arange(height))
+    return Image.fromarray(((x * 3 + y * 5) % 256).astype(np.uint8), "L")
+
+
+@pytest.mark.parametrize("origin", [(0, 0), (8, 16), (3, 5), (13, 42)])
+def test_bayer_tile_matches_canvas(origin: tuple[int, int]) -> None:
+    canvas = gradient()
+    x, y = origin
+    box = (x, y, x + 37, y + 19)
+    alone = dither(canvas.crop(box), Dither.BAYER, origin=origin)
+    within = dither(canvas, Dither.BAYER).crop(box)
+    assert alone.mode == within.mode == "1"
+    assert alone.tobytes() == within.tobytes()
+
+
+@pytest.mark.parametrize("method", list(Dither))
+def test_black_and_white_are_never_dithered(method: Dither) -> None:
+    for level, paper in ((0, False), (255, True)):
+        plane = dither(Image.new("L", (24, 16), level), method, origin=(5, 3))
+        assert plane.mode == "1"
+        assert (np.asarray(plane) == paper).all()
+
+
+def test_threshold_splits_at_mid_grey() -> None:
+    plane = np.asarray(dither(gradient(), Dither.THRESHOLD))
+    levels = np.asarray(gradient())
+    assert (plane == (levels >= 128)).all()
+
+
+def test_dithers_keep_the_grey_level() -> None:
+    grey = Image.new("L", (64, 64), 64)
+    for method in (Dither.BAYER, Dither.FLOYD_STEINBERG):
+        paper = np.asarray(dither(grey, method)).mean()
+        assert paper == pytest.approx(64 / 255, abs=0.03)
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from bedside import executor
+from bedside.dither import Dither, get_default, set_default
+from bedside.frame import render_plane
+from bedside.widget import load_sprite
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    method = get_default()
+    executor.shutdown()
+    yield
+    executor.shutdown()
+    set_default(method)
+
+
+def test_offload_defaults_to_threads() -> None:
+    name = asyncio.run(executor.offload(lambda: threading.current_thread().name))
+    assert isinstance(executor._executor, ThreadPoolExecutor)
+    assert name.startswith("bedside-render")
+
+
+def test_process_pool_renders_like_the_parent() -> None:
+    set_default(Dither.BAYER)
+    sprite = load_sprite("mewo", "desk.bmp")
+    expected = render_plane([sprite])
+    executor.configure(executor.ExecutorKind.PROCESS, 1)
+
+    async def run() -> tuple[int, object, bytes]:
+        return await asyncio.gather(
+            executor.offload(os.getpid),
+            executor.offload(load_sprite, "mewo", "desk.bmp"),
+            executor.offload(render_plane, [sprite]),
+        )
+
+    pid, loaded, rendered = asyncio.run(run())
+    assert isinstance(executor._executor, ProcessPoolExecutor)
+    assert pid != os.getpid()
+    # Sprites and planes make the round trip through pickling unchanged.
+    assert loaded.bbox == sprite.bbox
+    assert loaded.ink.tobytes() == sprite.ink.tobytes()
+    assert rendered == expected
+
+
+def test_process_workers_use_the_configured_dither() -> None:
+    set_default(Dither.BAYER)
+    executor.configure(executor.ExecutorKind.PROCESS, 1)
+    # Changed after configuring but before any worker starts: workers still get what configure saw.
+    set_default(Dither.THRESHOLD)
+    assert asyncio.run(executor.offload(get_default)) == Dither.BAYER
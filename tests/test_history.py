@@ -0,0 +1,100 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from bedside.frame import Frame
+from bedside.history import FrameHistory, HistoryEntry
+from bedside.pipeline import FramePipeline
+
+PLANE = 800 * 480 // 8
+
+
+def frame(ink: int, key: str | None = None) -> Frame:
+    black = bytearray(PLANE)
+    black[ink] = 0xFF
+    return Frame(black=bytes(black), red=bytes(PLANE), key=key, widgets=("background",))
+
+
+@pytest.fixture
+def history(tmp_path) -> FrameHistory:
+    return FrameHistory("bedside", capacity=4, directory=tmp_path)
+
+
+def test_ring_keeps_the_latest(history, tmp_path) -> None:
+    for ink in range(6):
+        history.append(frame(ink), {"push": 0.1})
+    assert [entry.sequence for entry in history.entries()] == [2, 3, 4, 5]
+    # Slot files are overwritten in turn, never added.
+    assert len(list(tmp_path.glob("*.bin"))) == 4
+
+
+def test_entries_survive_a_restart(history, tmp_path) -> None:
+    for ink in range(6):
+        history.append(frame(ink, key=str(ink)), {"push": 0.1})
+    reloaded = FrameHistory("bedside", capacity=4, directory=tmp_path)
+    assert reloaded.entries() == history.entries()
+    assert reloaded.get(5).frame() == frame(5)
+    assert reloaded.append(frame(6), {}).sequence == 6
+
+
+def test_get(history) -> None:
+    for ink in range(3):
+        history.append(frame(ink), {"wait": 0.5})
+    assert history.get(-1).sequence == 2
+    assert history.get(-3).etag == frame(0).etag
+    assert history.get(1).timings == {"wait": 0.5}
+    with pytest.raises(KeyError):
+        history.get(7)
+
+
+def test_unreadable_slot_is_ignored(history, tmp_path) -> None:
+    history.append(frame(0), {})
+    (tmp_path / "0001.bin").write_bytes(b"not a history entry")
+    assert [entry.sequence for entry in FrameHistory("bedside", directory=tmp_path).entries()] == [0]
+
+
+def test_entry_round_trip() -> None:
+    entry = HistoryEntry(0, "2026-10-19T07:00:00", "etag", 800, 480, b"black", b"red", "key", ("clock",), {"push": 1.0})
+    assert HistoryEntry.from_bytes(entry.to_bytes()) == entry
+
+
+def test_wants_every_new_frame(history) -> None:
+    assert history.wants(frame(0, key="a"))
+    history.append(frame(0, key="a"), {})
+    # Same widgets in the same places, different content: the clock ticking over, a new weather icon.
+    assert history.wants(frame(1, key="a"))
+    assert not history.wants(frame(0, key="a"))
+
+
+def test_pipeline_records_every_push(history) -> None:
+    async def sink(_: Frame) -> None:
+        pass
+
+    async def push(frames: list[Frame]) -> None:
+        # A fresh pipeline each time, as after a restart: it pushes the first frame even if the panel has it.
+        pipeline = FramePipeline(sink, history)
+        task = asyncio.create_task(pipeline.run())
+        for pushed in frames:
+            pipeline.submit(pushed)
+            while pipeline.shown is not pushed:
+                await asyncio.sleep(0.001)
+        while history.entries()[-1].etag != frames[-1].etag:
+            await asyncio.sleep(0.001)
+        task.cancel()
+
+    asyncio.run(push([frame(0, key="a"), frame(1, key="a"), frame(2, key="a"), frame(3, key="b")]))
+    asyncio.run(push([frame(3, key="b"), frame(4, key="b")]))
+    # The ring holds four; frame 3 pushed again after the restart is not a second entry.
+    assert [entry.etag for entry in history.entries()] == [frame(ink).etag for ink in (1, 2, 3, 4)]
+
+
+def test_export_of_a_missing_frame(tmp_path) -> None:
+    command = [sys.executable, "-m", "bedside.history", "--name", "empty", "export", "-1", str(tmp_path / "f.png")]
+    result = subprocess.run(  # noqa: S603
+        command, capture_output=True, text=True, env={**os.environ, "BEDSIDE_STATE_DIR": str(tmp_path)}
+    )
+    assert result.returncode == 2
+    assert "no frame -1 in history" in result.stderr
@@ -0,0 +1,95 @@
+import asyncio
+import datetime
+
+from bedside import main
+from bedside.clock import get_clock
+from bedside.frame import Frame, render_frame
+from bedside.mewo import MewoState, _mewo_img
+from bedside.widget import Widget, load_sprite
+
+
+class RecordingPipeline:
+    def __init__(self) -> None:
+        self.frames: list[Frame] = []
+
+    def submit(self, frame: Frame) -> None:
+        self.frames.append(frame)
+
+
+class RecordingScheduler:
+    def __init__(self) -> None:
+        self.jobs: list[tuple[datetime.datetime, object, tuple]] = []
+
+    def once(self, at: datetime.datetime, handle, args: tuple = ()) -> None:
+        self.jobs.append((at, handle, args))
+
+
+def test_weather_fetch_retries_with_backoff(monkeypatch) -> None:
+    attempts = 0
+
+    async def get_weather(latitude: float, longitude: float) -> Widget:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 8:
+            raise OSError("network is unreachable")
+        return Widget(name="weather", z=-99)
+
+    monkeypatch.setattr(main, "get_weather", get_weather)
+    scheduler = RecordingScheduler()
+
+    async def run() -> Widget:
+        queue = asyncio.Queue()
+        await main.fetch_weather(scheduler, queue, 51.5, -0.1, main.WEATHER_RETRY)
+        # Each failure arms the next attempt; run them as the scheduler would.
+        while queue.empty():
+            _, handle, args = scheduler.jobs[-1]
+            await handle(*args)
+        return queue.get_nowait()
+
+    widget = asyncio.run(run())
+    assert widget.name == "weather"
+    assert attempts == 8
+    retries = [args[-1] for _, _, args in scheduler.jobs]
+    assert retries == [datetime.timedelta(seconds=seconds) for seconds in (60, 120, 240, 480, 960, 1920, 3600)]
+    # The first retry is due 30 seconds after the failure.
+    first, _, _ = scheduler.jobs[0]
+    assert first - datetime.datetime.now() <= main.WEATHER_RETRY
+
+
+def test_weather_fetched_first_time_is_not_retried(monkeypatch) -> None:
+    async def get_weather(latitude: float, longitude: float) -> Widget:
+        return Widget(name="weather", z=-99)
+
+    monkeypatch.setattr(main, "get_weather", get_weather)
+    scheduler = RecordingScheduler()
+    queue = asyncio.Queue()
+    asyncio.run(main.fetch_weather(scheduler, queue, 51.5, -0.1, main.WEATHER_RETRY))
+    assert queue.qsize() == 1
+    assert scheduler.jobs == []
+
+
+def test_clock_is_composed_apart_from_other_widgets() -> None:
+    background = Widget(name="background", z=-100, bw=load_sprite("background.bmp"))
+    desk, floor = _mewo_img(MewoState.DESK, -99), _mewo_img(MewoState.floor, -99)
+    before, after = (get_clock(datetime.datetime(2026, 10, 19, 8, minute)) for minute in (59, 0))
+    pipeline = RecordingPipeline()
+
+    async def run() -> None:
+        queue = asyncio.Queue()
+        # Mewo's hourly tick lands with the clock's.
+        queue.put_nowait(after)
+        queue.put_nowait(floor)
+        compose = asyncio.create_task(main.compose_widgets(queue, [background, desk, before], pipeline, settle=0.01))
+        for _ in range(100):
+            if len(pipeline.frames) == 3:
+                break
+            await asyncio.sleep(0.01)
+        compose.cancel()
+
+    asyncio.run(run())
+    # The clock's own frame differs from the one before only in the clock's patch, a partial refresh.
+    assert pipeline.frames == [
+        render_frame([background, desk, before]),
+        render_frame([background, desk, after]),
+        render_frame([background, floor, after]),
+    ]
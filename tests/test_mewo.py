@@ -0,0 +1,28 @@
+import pytest
+
+from bedside.mewo import Mewo, MewoState
+
+
+@pytest.fixture(autouse=True)
+def state_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("BEDSIDE_STATE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_fresh_mewo() -> None:
+    mewo = Mewo.restore("bedside")
+    assert mewo.state is None
+    assert not mewo.asleep
+
+
+def test_displays_keep_their_own_pose() -> None:
+    Mewo(state=MewoState.DESK).save("bedroom")
+    Mewo(state=MewoState.SLEEP, asleep=True).save("hallway")
+    assert Mewo.restore("bedroom") == Mewo(state=MewoState.DESK, asleep=False)
+    assert Mewo.restore("hallway") == Mewo(state=MewoState.SLEEP, asleep=True)
+
+
+def test_unreadable_state_is_ignored(state_dir) -> None:
+    (state_dir / "mewo").mkdir()
+    (state_dir / "mewo" / "bedside.json").write_text("{not json")
+    assert Mewo.restore("bedside").state is None
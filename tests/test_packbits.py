@@ -0,0 +1,43 @@
+import os
+import random
+
+import pytest
+
+from bedside import packbits
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\x00",
+        b"ab",
+        b"\xff" * 3,
+        b"\xff" * 128,
+        b"\xff" * 129,
+        b"\x00" * 48000,
+        bytes(range(256)) * 3,
+        b"aab" * 100 + b"c" * 300 + b"xyz",
+    ],
+)
+def test_round_trip(data: bytes) -> None:
+    assert packbits.decode(packbits.encode(data)) == data
+
+
+def test_round_trip_random() -> None:
+    rng = random.Random(0)
+    for _ in range(200):
+        # Mostly paper with runs of ink, like a frame plane.
+        data = b"".join(bytes([rng.choice([0, 0xFF, rng.randrange(256)])]) * rng.randint(1, 200) for _ in range(20))
+        assert packbits.decode(packbits.encode(data)) == data
+
+
+def test_incompressible_overhead() -> None:
+    data = os.urandom(1280)
+    # One header byte per 128 literals.
+    assert len(packbits.encode(data)) <= len(data) + len(data) // 128 + 1
+
+
+def test_runs_compress() -> None:
+    assert packbits.encode(b"\xff" * 128) == bytes([129, 0xFF])
+    assert len(packbits.encode(b"\x00" * 48000)) == 48000 // 128 * 2
@@ -0,0 +1,124 @@
+import asyncio
+
+from bedside.frame import Frame
+from bedside.pipeline import FramePipeline
+
+PLANE = 800 * 480 // 8
+
+
+def frame(ink: int) -> Frame:
+    black = bytearray(PLANE)
+    black[ink] = 0xFF
+    return Frame(black=bytes(black), red=bytes(PLANE))
+
+
+class GatedSink:
+    # Takes frames one at a time, each only once the test opens the gate.
+    def __init__(self) -> None:
+        self.received: list[Frame] = []
+        self.gate = asyncio.Event()
+
+    async def __call__(self, received: Frame) -> None:
+        self.received.append(received)
+        await self.gate.wait()
+        self.gate.clear()
+        if received.black[0]:
+            raise OSError("panel unplugged")
+
+
+async def settle(condition) -> None:
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("pipeline did not get there")
+
+
+def test_newer_frame_replaces_one_not_yet_pushed() -> None:
+    async def run() -> None:
+        sink = GatedSink()
+        pipeline = FramePipeline(sink)
+        task = asyncio.create_task(pipeline.run())
+        pipeline.submit(frame(1))
+        await settle(lambda: sink.received)
+        # The device is busy with the first frame, so the second never reaches it.
+        pipeline.submit(frame(2))
+        pipeline.submit(frame(3))
+        sink.gate.set()
+        await settle(lambda: len(sink.received) == 2)
+        sink.gate.set()
+        await settle(lambda: pipeline.metrics.pushed == 2)
+        task.cancel()
+
+        assert sink.received == [frame(1), frame(3)]
+        assert pipeline.shown == frame(3)
+        assert (pipeline.metrics.submitted, pipeline.metrics.superseded) == (3, 1)
+
+    asyncio.run(run())
+
+
+def test_frame_already_shown_is_not_pushed_again() -> None:
+    async def run() -> None:
+        sink = GatedSink()
+        sink.gate.set()
+        pipeline = FramePipeline(sink)
+        task = asyncio.create_task(pipeline.run())
+        pipeline.submit(frame(1))
+        await settle(lambda: pipeline.metrics.pushed == 1)
+        pipeline.submit(frame(1))
+        await settle(lambda: pipeline.metrics.unchanged == 1)
+        task.cancel()
+
+        assert sink.received == [frame(1)]
+
+    asyncio.run(run())
+
+
+def test_failed_push_is_retried_when_submitted_again() -> None:
+    async def run() -> None:
+        sink = GatedSink()
+        pipeline = FramePipeline(sink)
+        task = asyncio.create_task(pipeline.run())
+        # Ink in the first byte makes the sink fail.
+        failing = Frame(black=b"\xff" + bytes(PLANE - 1), red=bytes(PLANE))
+        pipeline.submit(failing)
+        sink.gate.set()
+        await settle(lambda: sink.received and not sink.gate.is_set())
+        assert pipeline.shown is None
+        pipeline.submit(frame(1))
+        sink.gate.set()
+        await settle(lambda: pipeline.metrics.pushed == 1)
+        task.cancel()
+
+        assert pipeline.shown == frame(1)
+
+    asyncio.run(run())
+
+
+def test_metrics() -> None:
+    async def run() -> None:
+        sink = GatedSink()
+        pipeline = FramePipeline(sink)
+        task = asyncio.create_task(pipeline.run())
+        pipeline.submit(frame(1))
+        await settle(lambda: sink.received)
+        pipeline.submit(frame(2))
+        # The second frame waits in the ready slot while the device holds the first.
+        await asyncio.sleep(0.05)
+        sink.gate.set()
+        await settle(lambda: len(sink.received) == 2)
+        await asyncio.sleep(0.02)
+        sink.gate.set()
+        await settle(lambda: pipeline.metrics.pushed == 2)
+        task.cancel()
+
+        metrics = pipeline.metrics
+        assert metrics.max_wait >= 0.05
+        assert metrics.total_wait >= metrics.max_wait
+        assert metrics.device_busy >= 0.07
+        assert metrics.slot_full >= 0.05
+        device, slot = metrics.occupancy()
+        assert 0 < slot < device <= 1
+        assert "pushed 2/2 frames" in str(metrics)
+
+    asyncio.run(run())
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from bedside import client
+from bedside.frame import Frame
+from bedside.server import PLANE_ENCODING, FrameStore, create_app
+
+WIDTH, HEIGHT = 16, 4
+
+
+def frame(ink: int) -> Frame:
+    return Frame(black=bytes([ink]) * 8, red=bytes(8), width=WIDTH, height=HEIGHT)
+
+
+async def served(store: FrameStore, app: web.Application | None = None) -> TestClient:
+    http = TestClient(TestServer(app or create_app(store)))
+    await http.start_server()
+    return http
+
+
+def test_frame_and_not_modified() -> None:
+    async def run() -> None:
+        store = FrameStore()
+        await store.publish("bedside", frame(0x0F))
+        http = await served(store)
+        try:
+            response = await http.get("/displays/bedside/frame")
+            assert response.status == 200
+            etag = response.headers["ETag"]
+            assert etag == f'"{frame(0x0F).etag}"'
+            received = client._decode(await response.read(), response.headers)
+            assert received == frame(0x0F)
+
+            response = await http.get("/displays/bedside/frame", headers={"If-None-Match": etag})
+            assert response.status == 304
+            assert response.headers["ETag"] == etag
+
+            assert (await http.get("/displays/other/frame")).status == 404
+            assert await (await http.get("/displays")).json() == ["bedside"]
+        finally:
+            await http.close()
+
+    asyncio.run(run())
+
+
+def test_long_poll_returns_on_publish() -> None:
+    async def run() -> None:
+        store = FrameStore()
+        await store.publish("bedside", frame(0x0F))
+        http = await served(store)
+        try:
+            headers = {"If-None-Match": f'"{frame(0x0F).etag}"'}
+            poll = asyncio.create_task(http.get("/displays/bedside/frame", params={"wait": "30"}, headers=headers))
+            await asyncio.sleep(0.1)
+            assert not poll.done()
+            await store.publish("bedside", frame(0xF0))
+            response = await asyncio.wait_for(poll, 5)
+            assert response.status == 200
+            assert response.headers["ETag"] == f'"{frame(0xF0).etag}"'
+        finally:
+            await http.close()
+
+    asyncio.run(run())
+
+
+def test_long_poll_times_out_unchanged() -> None:
+    async def run() -> None:
+        store = FrameStore()
+        await store.publish("bedside", frame(0x0F))
+        http = await served(store)
+        try:
+            headers = {"If-None-Match": f'"{frame(0x0F).etag}"'}
+            response = await http.get("/displays/bedside/frame", params={"wait": "0.1"}, headers=headers)
+            assert response.status == 304
+        finally:
+            await http.close()
+
+    asyncio.run(run())
+
+
+def test_client_survives_panel_errors(monkeypatch) -> None:
+    monkeypatch.setattr(client, "RETRY_DELAY", 0)
+    shown: list[Frame] = []
+
+    async def flaky(received: Frame) -> None:
+        if not shown:
+            shown.append(None)
+            raise OSError("SPI transfer failed")
+        shown.append(received)
+
+    async def run() -> None:
+        store = FrameStore()
+        await store.publish("bedside", frame(0x0F))
+        http = await served(store)
+        try:
+            address = str(http.make_url("/"))
+            poll = asyncio.create_task(client.poll_frames(address, "bedside", flaky, wait=0.1))
+            for _ in range(50):
+                if len(shown) > 1:
+                    break
+                await asyncio.sleep(0.05)
+            poll.cancel()
+        finally:
+            await http.close()
+
+    asyncio.run(run())
+    assert shown[1:] == [frame(0x0F)]
+
+
+def test_decode_rejects_missing_headers() -> None:
+    with pytest.raises(ValueError, match="X-Black-Length"):
+        client._decode(bytes(16), {"X-Plane-Encoding": PLANE_ENCODING, "X-Frame-Size": "16x4"})
+
+
+def test_client_survives_malformed_responses(monkeypatch) -> None:
+    monkeypatch.setattr(client, "RETRY_DELAY", 0)
+    shown: list[Frame] = []
+    stripped = 0
+
+    @web.middleware
+    async def strip_length(request: web.Request, handler) -> web.StreamResponse:
+        # The first frame comes back without the header that splits the planes.
+        nonlocal stripped
+        response = await handler(request)
+        if not stripped:
+            stripped += 1
+            del response.headers["X-Black-Length"]
+        return response
+
+    async def show(received: Frame) -> None:
+        shown.append(received)
+
+    async def run() -> None:
+        store = FrameStore()
+        await store.publish("bedside", frame(0x0F))
+        app = create_app(store)
+        app.middlewares.append(strip_length)
+        http = await served(store, app)
+        try:
+            address = str(http.make_url("/"))
+            poll = asyncio.create_task(client.poll_frames(address, "bedside", show, wait=0.1))
+            for _ in range(50):
+                if shown:
+                    break
+                await asyncio.sleep(0.05)
+            assert not poll.done()
+            poll.cancel()
+        finally:
+            await http.close()
+
+    asyncio.run(run())
+    assert stripped == 1
+    assert shown == [frame(0x0F)]
@@ -0,0 +1,37 @@
+import datetime
+import sys
+
+import pytest
+
+import bedside
+from bedside import soak
+from bedside.mock import MockBus
+
+HOUR = 1 / 24
+
+
+@pytest.fixture
+def emulated(monkeypatch, tmp_path):
+    monkeypatch.setenv("BEDSIDE_STATE_DIR", str(tmp_path))
+    # Set here so the stub server's address the soak puts in it is undone afterwards.
+    monkeypatch.setenv("BEDSIDE_WEATHER_URL", "")
+    monkeypatch.setitem(sys.modules, "bedside.epdconfig", MockBus())
+    monkeypatch.delattr(bedside, "epdconfig", raising=False)
+    monkeypatch.delitem(sys.modules, "bedside.epd7in5b_V2", raising=False)
+    yield
+    # The driver was imported against the emulator; the next user imports it afresh.
+    sys.modules.pop("bedside.epd7in5b_V2", None)
+    vars(bedside).pop("epd7in5b_V2", None)
+
+
+def test_an_hour_on_the_virtual_clock(emulated) -> None:
+    start = datetime.datetime(2026, 1, 15, 12, 0, 30)
+    report = soak.run(HOUR, 51.5, -0.1, start)
+    # The first frame and one clock tick a minute; Mewo and the weather land on top of some of those.
+    assert 60 <= report.refreshes[0] <= 70
+    assert len(report.lateness) >= 60
+    assert max(report.lateness) < 1.0
+    # The patched datetime modules are put back.
+    from bedside import main
+
+    assert main.datetime is datetime
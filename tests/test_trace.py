@@ -0,0 +1,156 @@
+import importlib
+import io
+import sys
+
+import pytest
+
+from bedside import trace
+from bedside.mock import MockBus
+from bedside.trace import Op, Recorder
+
+
+def recorded(bus: MockBus, calls) -> io.BytesIO:
+    output = io.BytesIO()
+    with Recorder(bus, output):
+        calls(bus)
+    output.seek(0)
+    return output
+
+
+def command(bus: MockBus, cmd: int, data: bytes = b"") -> None:
+    bus.digital_write(bus.DC_PIN, 0)
+    bus.spi_writebyte([cmd])
+    if data:
+        bus.digital_write(bus.DC_PIN, 1)
+        bus.spi_writebyte2(bytearray(data))
+
+
+class SlowPanel(MockBus):
+    # Busy for a number of BUSY reads after each refresh command; counts module_init/module_exit.
+
+    def __init__(self, busy_reads: int) -> None:
+        super().__init__()
+        self.busy_reads = busy_reads
+        self.remaining = 0
+        self.opened = 0
+        self.closed = 0
+
+    def spi_writebyte(self, data):
+        super().spi_writebyte(data)
+        if not self.pins.get(self.DC_PIN) and 0x12 in data:
+            self.remaining = self.busy_reads
+
+    def digital_read(self, pin):
+        if pin == self.BUSY_PIN and self.remaining:
+            self.remaining -= 1
+            return 0
+        return super().digital_read(pin)
+
+    def module_init(self, cleanup=False):
+        self.opened += 1
+        return 0
+
+    def module_exit(self, close=True, cleanup=False):
+        self.closed += 1
+
+
+def refresh(bus: MockBus) -> None:
+    command(bus, 0x10, b"\xff" * 100)
+    command(bus, 0x13, b"\x00" * 100)
+    command(bus, 0x12)
+    bus.delay_ms(100)
+    while not bus.digital_read(bus.BUSY_PIN):
+        bus.delay_ms(10)
+
+
+def test_record_and_read_back() -> None:
+    bus = MockBus()
+    pins, transactions = trace.read(recorded(bus, refresh))
+    assert pins == trace.Pins(busy=MockBus.BUSY_PIN, dc=MockBus.DC_PIN)
+    transactions = list(transactions)
+    assert [t.op for t in transactions] == [
+        Op.DIGITAL_WRITE,
+        Op.SPI_WRITEBYTE,
+        Op.DIGITAL_WRITE,
+        Op.SPI_WRITEBYTE2,
+        Op.DIGITAL_WRITE,
+        Op.SPI_WRITEBYTE,
+        Op.DIGITAL_WRITE,
+        Op.SPI_WRITEBYTE2,
+        Op.DIGITAL_WRITE,
+        Op.SPI_WRITEBYTE,
+        Op.DELAY_MS,
+        Op.DIGITAL_READ,
+    ]
+    assert transactions[3].data == b"\xff" * 100
+    assert transactions[10].delay == 100
+    assert (transactions[11].pin, transactions[11].value) == (MockBus.BUSY_PIN, 1)
+    # Starts are relative to the trace and in order.
+    assert [t.start for t in transactions] == sorted(t.start for t in transactions)
+    # The wrappers are removed again.
+    assert bus.spi_writebyte.__func__ is MockBus.spi_writebyte
+
+
+def test_analyse() -> None:
+    stats = trace.analyse(*trace.read(recorded(SlowPanel(busy_reads=3), refresh)))
+    assert stats.spi_bytes == 203
+    assert stats.bulk_bytes == 200
+    assert stats.gpio_writes == 5
+    assert stats.gpio_reads == 4
+    assert stats.delay_time == pytest.approx(0.13)
+    assert stats.busy_time > 0
+
+
+def test_diff() -> None:
+    def changed(bus: MockBus) -> None:
+        command(bus, 0x10, b"\xff" * 100)
+        command(bus, 0x13, b"\x00" * 50 + b"\x01" + b"\x00" * 49)
+
+    same = trace.diff(trace.read(recorded(MockBus(), refresh)), trace.read(recorded(MockBus(), refresh)))
+    assert same is None
+    # Command 0x10, its 100 bytes, command 0x13, then 50 matching data bytes.
+    assert trace.diff(trace.read(recorded(MockBus(), refresh)), trace.read(recorded(MockBus(), changed))) == 152
+    # A trace that stops early diverges where it ends.
+    assert trace.diff(trace.read(recorded(MockBus(), changed)), trace.read(recorded(MockBus(), refresh))) == 152
+
+
+def test_replay_sends_the_same_bytes() -> None:
+    source = recorded(MockBus(), refresh).getvalue()
+    target = SlowPanel(busy_reads=0)
+    stats = trace.replay(*trace.read(io.BytesIO(source)), target)
+    assert stats.spi_bytes == 203
+    assert bytes(target.data[0x13]) == b"\x00" * 100
+    assert (target.opened, target.closed) == (1, 1)
+
+
+def test_replay_waits_out_busy() -> None:
+    # Recorded against a panel that finished at once, replayed on one that stays busy for a while.
+    source = recorded(MockBus(), refresh).getvalue()
+    target = SlowPanel(busy_reads=5)
+    stats = trace.replay(*trace.read(io.BytesIO(source)), target)
+    assert target.remaining == 0
+    assert stats.gpio_reads == 6
+    assert stats.busy_time > 0
+
+
+def test_driver_trace_replays_identically(monkeypatch) -> None:
+    # The driver reaches the hardware only through epdconfig, so the bus emulator takes its place.
+    monkeypatch.setitem(sys.modules, "bedside.epdconfig", MockBus())
+    monkeypatch.delitem(sys.modules, "bedside.epd7in5b_V2", raising=False)
+    driver = importlib.import_module("bedside.epd7in5b_V2")
+    try:
+        epd = driver.EPD()
+        output = io.BytesIO()
+        with Recorder(driver.epdconfig, output):
+            epd.init()
+            epd.display(bytearray(b"\x0f" * (800 * 480 // 8)), bytearray(800 * 480 // 8))
+        # Recorded once more around the replay to compare what the emulator received.
+        target, replayed = MockBus(), io.BytesIO()
+        with Recorder(target, replayed):
+            output.seek(0)
+            trace.replay(*trace.read(output), target)
+        output.seek(0)
+        replayed.seek(0)
+        assert trace.diff(trace.read(output), trace.read(replayed)) is None
+    finally:
+        sys.modules.pop("bedside.epd7in5b_V2", None)
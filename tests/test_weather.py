@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from bedside import weather
+from bedside.weather import Weather, WeatherBatcher
+
+WELLINGTON = (-41.29, 174.78)
+LONDON = (51.5, -0.1)
+CODES = {WELLINGTON: Weather.RAIN, LONDON: Weather.CLOUDY}
+
+
+@pytest.fixture
+def fetches(monkeypatch) -> list[list[weather.Location]]:
+    calls: list[list[weather.Location]] = []
+
+    async def fetch(locations: list[weather.Location]) -> list[Weather]:
+        calls.append(list(locations))
+        await asyncio.sleep(0.01)
+        return [CODES[location] for location in locations]
+
+    monkeypatch.setattr(weather, "fetch_weather_codes", fetch)
+    return calls
+
+
+def test_batches_and_deduplicates(fetches) -> None:
+    async def run() -> list[Weather]:
+        batcher = WeatherBatcher(window=0.05)
+        return await asyncio.gather(
+            batcher.get(*WELLINGTON), batcher.get(*LONDON), batcher.get(*WELLINGTON), batcher.get(*WELLINGTON)
+        )
+
+    assert asyncio.run(run()) == [Weather.RAIN, Weather.CLOUDY, Weather.RAIN, Weather.RAIN]
+    assert fetches == [[WELLINGTON, LONDON]]
+
+
+def test_joins_a_request_in_flight(fetches) -> None:
+    async def run() -> tuple[Weather, Weather]:
+        batcher = WeatherBatcher(window=0.01)
+        first = asyncio.create_task(batcher.get(*LONDON))
+        # The second caller arrives once the upstream call is under way.
+        while not fetches:
+            await asyncio.sleep(0.001)
+        second = asyncio.create_task(batcher.get(*LONDON))
+        return await first, await second
+
+    assert asyncio.run(run()) == (Weather.CLOUDY, Weather.CLOUDY)
+    assert fetches == [[LONDON]]
+
+
+def test_new_batch_after_answer(fetches) -> None:
+    async def run() -> None:
+        batcher = WeatherBatcher(window=0.01)
+        await batcher.get(*LONDON)
+        await batcher.get(*LONDON)
+
+    asyncio.run(run())
+    assert fetches == [[LONDON], [LONDON]]
+
+
+def test_errors_reach_every_caller(monkeypatch) -> None:
+    async def fail(locations: list[weather.Location]) -> list[Weather]:
+        raise ValueError("upstream down")
+
+    monkeypatch.setattr(weather, "fetch_weather_codes", fail)
+
+    async def run() -> list[object]:
+        batcher = WeatherBatcher(window=0.01)
+        return await asyncio.gather(batcher.get(*LONDON), batcher.get(*WELLINGTON), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(run())] == [ValueError, ValueError]
+
+
+def test_cancelled_caller_leaves_others_answered(fetches) -> None:
+    async def run() -> Weather:
+        batcher = WeatherBatcher(window=0.01)
+        impatient = asyncio.create_task(batcher.get(*LONDON))
+        patient = asyncio.create_task(batcher.get(*LONDON))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == Weather.CLOUDY
+
+
+@pytest.mark.parametrize("locations", [[LONDON], [WELLINGTON, LONDON]])
+def test_fetch_weather_codes(monkeypatch, locations: list[weather.Location]) -> None:
+    # Open-Meteo answers a single location with an object and several with a list.
+    async def forecast(request: web.Request) -> web.Response:
+        latitudes = [float(latitude) for latitude in request.query["latitude"].split(",")]
+        longitudes = [float(longitude) for longitude in request.query["longitude"].split(",")]
+        codes = {WELLINGTON: 61, LONDON: 2}
+        forecasts = [{"daily": {"weather_code": [codes[location]]}} for location in zip(latitudes, longitudes)]
+        return web.json_response(forecasts if len(forecasts) > 1 else forecasts[0])
+
+    async def run() -> list[Weather]:
+        app = web.Application()
+        app.router.add_get("/v1/forecast", forecast)
+        server = TestServer(app)
+        await server.start_server()
+        monkeypatch.setenv(weather.WEATHER_URL_ENV, str(server.make_url("/v1/forecast")))
+        try:
+            return await weather.fetch_weather_codes(locations)
+        finally:
+            await server.close()
+
+    assert asyncio.run(run()) == [CODES[location] for location in locations]